@@ -1,14 +1,42 @@
 import argparse
+import array
+import asyncio
+import fnmatch
+import functools
+import hashlib
+import ipaddress
+import itertools
 import json
+import os
+import pickle
+import re
+import socket
+import stat
+import sys
+import threading
+from collections import deque
+from collections import OrderedDict
+from concurrent.futures import as_completed
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
 from dataclasses import dataclass
 from dataclasses import field
 from io import TextIOWrapper
 from pathlib import Path
 from typing import Any
+from typing import Callable
+from typing import Deque
 from typing import Dict
+from typing import Hashable
+from typing import Iterable
 from typing import Iterator
 from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Set
+from typing import Tuple
+from typing import Type
+from typing import TypeVar
 from typing import Union
 
 try:
@@ -19,10 +47,25 @@ except ImportError:  # pragma: no cover
 
 __version__ = "1.4.3"
 
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_CACHE_ENTRIES = 128
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+DEFAULT_INPUT_CACHE_ENTRIES = 1024
 
-def main():
-    parser = _create_parser()
-    args = parser.parse_args()
+TEXT_OUTPUT_FORMATS = ("json", "json-compact", "yaml")
+BINARY_OUTPUT_FORMATS = ("pickle",)
+OUTPUT_FORMATS = TEXT_OUTPUT_FORMATS + BINARY_OUTPUT_FORMATS
+PICKLE_SUFFIXES = (".pickle", ".pkl")
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    _argv = sys.argv[1:] if argv is None else list(argv)
+    if _argv and _argv[0] in _SUBCOMMANDS:
+        parser = _SUBCOMMANDS[_argv[0]]()
+        _argv = _argv[1:]
+    else:
+        parser = _create_parser()
+    args = parser.parse_args(_argv)
 
     if hasattr(args, "handler"):
         return args.handler(args)
@@ -36,7 +79,8 @@ def _create_parser(
     # setup the parser
     if parser is None:
         desc = "Combine multiple dcm2bids config files into a single config file."
-        _parser = argparse.ArgumentParser(description=desc)
+        epilog = f"subcommands: {', '.join(_SUBCOMMANDS)} (see '<subcommand> --help')"
+        _parser = argparse.ArgumentParser(description=desc, epilog=epilog)
     else:
         _parser = parser
 
@@ -58,26 +102,339 @@ def _create_parser(
     if yaml is not None:
         _parser.add_argument(
             "--to-yaml",
-            action="store_true",
-            default=False,
-            help="Format the output as YAML.",
+            action="store_const",
+            dest="output_format",
+            const="yaml",
+            default="json",
+            help="Format the output as YAML (same as '--format yaml').",
         )
+    _parser.add_argument(
+        "-f",
+        "--format",
+        dest="output_format",
+        choices=[f for f in OUTPUT_FORMATS if f != "yaml" or yaml is not None],
+        default="json",
+        help="The output format. 'json-compact' is single-line JSON, 'pickle' "
+        "is a binary format which loads much faster in python (only load "
+        "pickle files you trust). Default: %(default)s",
+    )
+    _parser.add_argument(
+        "--allow-pickle",
+        action="store_true",
+        default=False,
+        help="Allow .pickle/.pkl input files. Unpickling can run arbitrary "
+        "code, so only use this with files you trust.",
+    )
+    _parser.add_argument(
+        "--validate",
+        action="store_true",
+        default=False,
+        help="Validate the input config files before combining them.",
+    )
+    _parser.add_argument(
+        "--source-map",
+        type=Path,
+        help="Also write a source map (JSON) recording which input file, and "
+        "index within it, each combined description came from.",
+    )
     _parser.set_defaults(handler=_handler)
 
     return _parser
 
 
+def _create_serve_parser(
+    parser: Union[argparse.ArgumentParser, None] = None,
+) -> argparse.ArgumentParser:
+    if parser is None:
+        desc = "Run a long-lived compile server which caches parsed inputs/outputs."
+        _parser = argparse.ArgumentParser(prog=f"{_PROG} serve", description=desc)
+    else:
+        _parser = parser
+
+    address = _parser.add_mutually_exclusive_group(required=True)
+    address.add_argument(
+        "--socket",
+        type=Path,
+        help="Path of the Unix socket to listen on.",
+    )
+    address.add_argument(
+        "--port",
+        type=int,
+        help="TCP port to listen on (see also --host).",
+    )
+    _parser.add_argument(
+        "--host",
+        type=_loopback_host,
+        default="127.0.0.1",
+        help="Loopback host to bind to when listening on a TCP port. "
+        "Default: %(default)s",
+    )
+    _parser.add_argument(
+        "--root",
+        dest="roots",
+        action="append",
+        type=Path,
+        help="Only read input files under this directory (can be repeated). "
+        "Recommended with --port, where any local user can connect.",
+    )
+    _parser.add_argument(
+        "--cache-entries",
+        type=int,
+        default=DEFAULT_CACHE_ENTRIES,
+        help="Maximum number of combined outputs to cache. Default: %(default)s",
+    )
+    _parser.add_argument(
+        "--cache-bytes",
+        type=int,
+        default=DEFAULT_CACHE_BYTES,
+        help="Maximum total size (in bytes) of the cached combined outputs. "
+        "Default: %(default)s",
+    )
+    _parser.add_argument(
+        "--cache-inputs",
+        type=int,
+        default=DEFAULT_INPUT_CACHE_ENTRIES,
+        help="Maximum number of parsed input files to keep. Default: %(default)s",
+    )
+    _parser.set_defaults(handler=_serve_handler)
+
+    return _parser
+
+
+def _create_match_parser(
+    parser: Union[argparse.ArgumentParser, None] = None,
+) -> argparse.ArgumentParser:
+    if parser is None:
+        desc = "Report which descriptions of a config match each sidecar JSON file."
+        _parser = argparse.ArgumentParser(prog=f"{_PROG} match", description=desc)
+    else:
+        _parser = parser
+
+    _parser.add_argument(
+        "config",
+        type=Path,
+        help="The (combined) config file",
+    )
+    _parser.add_argument(
+        "sidecar_dir",
+        type=Path,
+        help="Directory to (recursively) search for sidecar JSON files",
+    )
+    _parser.add_argument(
+        "-j",
+        "--jobs",
+        type=_positive_int,
+        default=DEFAULT_MAX_CONCURRENCY,
+        help="Number of sidecar files to process in parallel. Default: %(default)s",
+    )
+    _parser.add_argument(
+        "--json",
+        action="store_true",
+        default=False,
+        help="Output a JSON object mapping each sidecar to its matching "
+        "description indices.",
+    )
+    _parser.add_argument(
+        "-o",
+        "--out-file",
+        type=argparse.FileType("w", encoding="utf8"),
+        default="-",
+        help="The file to write the report to. If not specified the report is "
+        "written to stdout.",
+    )
+    _parser.set_defaults(handler=_match_handler)
+
+    return _parser
+
+
+def _create_validate_parser(
+    parser: Union[argparse.ArgumentParser, None] = None,
+) -> argparse.ArgumentParser:
+    if parser is None:
+        desc = "Check the descriptions of dcm2bids config files for problems."
+        _parser = argparse.ArgumentParser(prog=f"{_PROG} validate", description=desc)
+    else:
+        _parser = parser
+
+    _parser.add_argument(
+        "in_file",
+        nargs="+",
+        type=Path,
+        help="The config files to validate",
+    )
+    _parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        default=False,
+        help="Stop at the first problem found.",
+    )
+    _parser.add_argument(
+        "-j",
+        "--jobs",
+        type=_positive_int,
+        default=DEFAULT_MAX_CONCURRENCY,
+        help="Number of files to load/validate in parallel. Default: %(default)s",
+    )
+    _parser.set_defaults(handler=_validate_handler)
+
+    return _parser
+
+
+def _create_diff_parser(
+    parser: Union[argparse.ArgumentParser, None] = None,
+) -> argparse.ArgumentParser:
+    if parser is None:
+        desc = "Show the semantic differences between two (combined) config files."
+        _parser = argparse.ArgumentParser(prog=f"{_PROG} diff", description=desc)
+    else:
+        _parser = parser
+
+    _parser.add_argument("old_file", type=Path, help="The previous config file")
+    _parser.add_argument("new_file", type=Path, help="The new config file")
+    _parser.add_argument(
+        "--json",
+        action="store_true",
+        default=False,
+        help="Output the differences as JSON.",
+    )
+    _parser.set_defaults(handler=_diff_handler)
+
+    return _parser
+
+
+def _positive_int(value: str) -> int:
+    n = int(value)
+    if n < 1:
+        msg = f"expected a positive integer, got [{value}]"
+        raise argparse.ArgumentTypeError(msg)
+    return n
+
+
+def _loopback_host(host: str) -> str:
+    if not _is_loopback(host):
+        msg = f"refusing to listen on non-loopback host [{host}]"
+        raise argparse.ArgumentTypeError(msg)
+    return host
+
+
 def _handler(args: argparse.Namespace):
     in_files: list[Path] = args.in_file
     out_file: TextIOWrapper = args.out_file
-    to_yaml: bool = getattr(args, "to_yaml", False)
+    output_format: str = args.output_format
+    allow_pickle: bool = args.allow_pickle
     # load all the config files passed as arguments
-    configs = [load_config_file(fp) for fp in in_files]
+    configs = [
+        (
+            load_pickle_config(fp)
+            if allow_pickle and fp.suffix in PICKLE_SUFFIXES
+            else load_config_file(fp)
+        )
+        for fp in in_files
+    ]
     # combine the config files into one config
-    combined_config = combine_config(configs)
+    combined_config = combine_config(configs, validate=args.validate)
     # write the combined config file to disk
+    output: Union[str, bytes]
+    if output_format in BINARY_OUTPUT_FORMATS:
+        output = serialize_config_bytes(combined_config, output_format)
+    else:
+        output = serialize_config(combined_config, output_format=output_format)
     with out_file as f:
-        f.write(serialize_config(combined_config, to_yaml=to_yaml))
+        if isinstance(output, bytes):
+            f.flush()
+            f.buffer.write(output)
+        else:
+            f.write(output)
+    # write the source map (if requested)
+    if args.source_map is not None:
+        sources = [str(fp) for fp in in_files]
+        ConfigCollection(configs).source_map(sources).dump(args.source_map)
+
+
+def _serve_handler(args: argparse.Namespace):
+    service = CompileService(
+        max_entries=args.cache_entries,
+        max_bytes=args.cache_bytes,
+        max_inputs=args.cache_inputs,
+        roots=args.roots,
+    )
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(
+        start_compile_server(service, host=args.host, port=args.port, path=args.socket),
+    )
+    if args.socket is not None:
+        address = str(args.socket)
+    else:
+        host, port = server.sockets[0].getsockname()[:2]
+        address = f"{host}:{port}"
+    print(f"Listening on {address}", file=sys.stderr, flush=True)
+    if args.socket is None and args.roots is None:
+        msg = (
+            "Warning: any local user can connect to this port and read any file "
+            "this server can read, use --root to restrict the input files"
+        )
+        print(msg, file=sys.stderr, flush=True)
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:  # pragma: no cover
+        pass
+    finally:
+        server.close()
+        loop.run_until_complete(server.wait_closed())
+        loop.close()
+
+
+def _match_handler(args: argparse.Namespace) -> int:
+    config = load_config_file(args.config)
+    sidecar_dir: Path = args.sidecar_dir
+    sidecars = sorted(sidecar_dir.rglob("*.json"))
+    descriptions: List[Dict[str, Any]] = config.get("descriptions") or []
+    matches = match_sidecars(config, sidecars, jobs=args.jobs)
+    with args.out_file as f:
+        if args.json:
+            report = {
+                str(m.path.relative_to(sidecar_dir)): (
+                    m.indices if m.error is None else {"error": m.error}
+                )
+                for m in matches
+            }
+            f.write(json.dumps(report, indent=2) + "\n")
+        else:
+            for m in matches:
+                f.write(f"{m.path.relative_to(sidecar_dir)}: ")
+                f.write(_format_match(m, descriptions) + "\n")
+    return 1 if any(m.error is not None for m in matches) else 0
+
+
+def _format_match(match: "SidecarMatch", descriptions: List[Dict[str, Any]]) -> str:
+    if match.error is not None:
+        return f"error: {match.error}"
+    found = ", ".join(f"{i} ({_label(descriptions[i])})" for i in match.indices)
+    return found or "-"
+
+
+def _validate_handler(args: argparse.Namespace) -> int:
+    issues = validate_config_files(args.in_file, args.fail_fast, args.jobs)
+    for issue in issues:
+        print(issue)
+    return 1 if issues else 0
+
+
+def _diff_handler(args: argparse.Namespace) -> int:
+    old = load_config_file(args.old_file)
+    new = load_config_file(args.new_file)
+    config_diff = diff_configs(old, new)
+    if args.json:
+        print(json.dumps(config_diff.to_dict(), indent=2))
+    else:
+        for line in config_diff.format(old, new):
+            print(line)
+    return 1 if config_diff else 0
+
+
+def _label(description: Dict[str, Any]) -> str:
+    parts = ("dataType", "modalityLabel", "customLabels")
+    return "/".join(str(description[p]) for p in parts if p in description)
 
 
 def load_config_file(fp: Path) -> Dict[str, Any]:
@@ -85,27 +442,86 @@ def load_config_file(fp: Path) -> Dict[str, Any]:
         if yaml is None:
             raise YamlLoadError(fp)
         return yaml.load(fp.read_text(), Loader=yaml.SafeLoader)
+    if fp.suffix in PICKLE_SUFFIXES:
+        raise PickleLoadError(fp)
     return json.loads(fp.read_text())
 
 
-def serialize_config(data: Dict[str, Any], to_yaml: bool = False) -> str:
-    if to_yaml:
+def load_pickle_config(fp: Path) -> Dict[str, Any]:
+    """Load a config written with `serialize_config_bytes(..., "pickle")`.
+
+    Unpickling can run arbitrary code, only ever load pickle files you trust.
+    """
+    return pickle.loads(fp.read_bytes())
+
+
+def _resolve_output_format(to_yaml: bool, output_format: str) -> str:
+    if not to_yaml:
+        return output_format
+    if output_format not in ("json", "yaml"):
+        m = f"to_yaml conflicts with output_format [{output_format}]"
+        raise ValueError(m)
+    return "yaml"
+
+
+def serialize_config(
+    data: Dict[str, Any],
+    to_yaml: bool = False,
+    output_format: str = "json",
+) -> str:
+    """Serialize a config dict to one of the `TEXT_OUTPUT_FORMATS`.
+
+    Args:
+        data (dict[str, Any]): The config dict to serialize.
+        to_yaml (bool): Shorthand for `output_format="yaml"`.
+        output_format (str): One of `TEXT_OUTPUT_FORMATS`, see
+            `serialize_config_bytes` for the binary formats.
+
+    Returns:
+        str: The serialized config.
+    """
+    output_format = _resolve_output_format(to_yaml, output_format)
+    if output_format == "yaml":
         if yaml is None:
             raise YamlDumpError()
         return yaml.dump(data, Dumper=yaml_dumper_factory(), sort_keys=False)
-    return json.dumps(data, indent=2) + "\n"
+    if output_format == "json":
+        return json.dumps(data, indent=2) + "\n"
+    if output_format == "json-compact":
+        return json.dumps(data, separators=(",", ":")) + "\n"
+    m = f"output_format must be one of {TEXT_OUTPUT_FORMATS}. Found [{output_format}]"
+    raise ValueError(m)
 
 
-def combine_config(input_configs: List[Dict[str, Any]]) -> Dict[str, Any]:
+def serialize_config_bytes(
+    data: Dict[str, Any], output_format: str = "pickle"
+) -> bytes:
+    """Serialize a config dict to one of the `BINARY_OUTPUT_FORMATS`."""
+    if output_format == "pickle":
+        return _pickle(data)
+    m = f"output_format must be one of {BINARY_OUTPUT_FORMATS}. Found [{output_format}]"
+    raise ValueError(m)
+
+
+def combine_config(
+    input_configs: List[Dict[str, Any]],
+    validate: bool = False,
+) -> Dict[str, Any]:
     """Combine multiple dcm2bids config dicts into a single config dict.
 
     Args:
         input_configs (list[dict[str, Any]]): A list of dcm2bids configs (dicts)
+        validate (bool): Validate all the input configs first, raising a
+            `ConfigValidationError` listing every problem found.
 
     Returns:
         dict[str, Any]: The combined/merged config dict.
     """
 
+    if validate:
+        issues = validate_configs(input_configs)
+        if issues:
+            raise ConfigValidationError(issues)
     config_collection = ConfigCollection(input_configs)
     return config_collection.combined()
 
@@ -131,11 +547,7 @@ class ConfigCollection:
 
     def descriptions(self) -> Iterator[Dict[str, Any]]:
         seen_ids = set()
-        offset = 0
-        for config in self.configs:
-            descriptions: Union[List[Dict[str, Any]], None] = config.get("descriptions")
-            if descriptions is None:
-                continue
+        for _, offset, descriptions in self.segments():
             for description in descriptions:
                 desc_id = description.get("id")
                 if isinstance(desc_id, str) and desc_id in seen_ids:
@@ -145,8 +557,36 @@ class ConfigCollection:
 
                 yield update_intended_for(description, offset)
 
+    def segments(self) -> Iterator[Tuple[int, int, List[Dict[str, Any]]]]:
+        """Yield (config index, offset, descriptions) for each config.
+
+        The offset is the index of the config's first description in the combined
+        config. Configs without a 'descriptions' key are skipped.
+        """
+        offset = 0
+        for i, config in enumerate(self.configs):
+            descriptions: Union[List[Dict[str, Any]], None] = config.get("descriptions")
+            if descriptions is None:
+                continue
+            yield i, offset, descriptions
             offset += len(descriptions)
 
+    def source_map(self, sources: Union[Sequence[str], None] = None) -> "SourceMap":
+        """Map each combined description back to the config it came from.
+
+        Args:
+            sources (Sequence[str] | None): Names (e.g. file paths) of the
+                configs, defaults to 'config[<position>]'.
+        """
+        _sources = sources or [f"config[{i}]" for i in range(len(self.configs))]
+        source_map = SourceMap(list(_sources))
+        for i, offset, descriptions in self.segments():
+            n = len(descriptions)
+            source_map.source_ids.extend(array.array("l", [i]) * n)
+            source_map.indices.extend(range(n))
+            source_map.offsets.extend(array.array("l", [offset]) * n)
+        return source_map
+
 
 TIntendedFor = Union[int, str, List[Union[int, str]], None]
 
@@ -178,6 +618,1329 @@ def update_intended_for(description: Dict[str, Any], offset: int) -> Dict[str, A
     return _description
 
 
+# --- SOURCE MAPS ---
+
+
+@dataclass
+class SourceLocation:
+    source: str
+    index: int
+    offset: int
+
+
+@dataclass
+class SourceMap:
+    """Where each description of a combined config came from.
+
+    Stored as columns (one entry per combined description): the position of
+    the source config in `sources`, the description's index within that
+    config and the offset which was added to its `IntendedFor` indices.
+    """
+
+    sources: List[str] = field(default_factory=list)
+    source_ids: "array.array[int]" = field(default_factory=lambda: array.array("l"))
+    indices: "array.array[int]" = field(default_factory=lambda: array.array("l"))
+    offsets: "array.array[int]" = field(default_factory=lambda: array.array("l"))
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def lookup(self, index: int) -> SourceLocation:
+        """Find where the description at `index` in the combined config came from."""
+        if not 0 <= index < len(self):
+            raise IndexError(f"No description with index [{index}] in source map")
+        source = self.sources[self.source_ids[index]]
+        return SourceLocation(source, self.indices[index], self.offsets[index])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": 1,
+            "sources": self.sources,
+            "source": self.source_ids.tolist(),
+            "index": self.indices.tolist(),
+            "offset": self.offsets.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SourceMap":
+        return cls(
+            list(data["sources"]),
+            array.array("l", data["source"]),
+            array.array("l", data["index"]),
+            array.array("l", data["offset"]),
+        )
+
+    def dump(self, fp: Path) -> None:
+        fp.write_text(json.dumps(self.to_dict(), separators=(",", ":")) + "\n")
+
+    @classmethod
+    def load(cls, fp: Path) -> "SourceMap":
+        return cls.from_dict(json.loads(fp.read_text()))
+
+
+# --- CACHING ---
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    bytes: int = 0
+
+
+class LRUCache:
+    """Thread-safe least-recently-used cache bounded by entry count and/or size.
+
+    Args:
+        max_entries (int | None): Maximum number of entries to keep.
+        max_bytes (int | None): Maximum total size of the cached values, as
+            measured by `sizeof`.
+        sizeof (Callable[[Any], int] | None): Returns the size (in bytes) of a
+            cached value. Required if `max_bytes` is given.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[Any], int]] = None,
+    ):
+        if max_bytes is not None and sizeof is None:
+            raise ValueError("sizeof is required when max_bytes is given")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._data: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self._stats.misses += 1
+                return default
+            self._stats.hits += 1
+            self._data.move_to_end(key)
+            return item[0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        size = self._sizeof(value) if self._sizeof is not None else 0
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._stats.bytes -= old[1]
+            if self.max_bytes is not None and size > self.max_bytes:
+                # never going to fit, don't flush the whole cache trying
+                self._stats.entries = len(self._data)
+                return
+            self._data[key] = (value, size)
+            self._stats.bytes += size
+            self._evict()
+            self._stats.entries = len(self._data)
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            item = self._data.pop(key, None)
+            if item is not None:
+                self._stats.bytes -= item[1]
+                self._stats.entries = len(self._data)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._stats.entries = self._stats.bytes = 0
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(**vars(self._stats))
+
+    def _evict(self):
+        while self._data and (
+            (self.max_entries is not None and len(self._data) > self.max_entries)
+            or (self.max_bytes is not None and self._stats.bytes > self.max_bytes)
+        ):
+            _, (_, size) = self._data.popitem(last=False)
+            self._stats.bytes -= size
+            self._stats.evictions += 1
+
+
+def _fingerprint(obj: Any) -> str:
+    return hashlib.blake2b(_pickle(obj), digest_size=16).hexdigest()
+
+
+def _pickle(obj: Any) -> bytes:
+    return pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+class MemoizedCombiner:
+    """Memoizing alternative to `combine_config` for repeated, overlapping calls.
+
+    Each input config is fingerprinted once per call. The rebased descriptions
+    of a config are cached per (config fingerprint, offset) and the merged
+    top-level parameters are cached per tuple of input fingerprints. Cached
+    values are stored pickled, so every call returns fresh objects which are
+    safe to mutate.
+
+    Args:
+        max_entries (int | None): Maximum number of entries in each cache.
+        max_bytes (int | None): Maximum total (pickled) size of each cache.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = DEFAULT_CACHE_ENTRIES,
+        max_bytes: Optional[int] = DEFAULT_CACHE_BYTES,
+    ):
+        self.segments = LRUCache(max_entries, max_bytes, sizeof=self._sizeof)
+        self.params = LRUCache(max_entries, max_bytes, sizeof=self._sizeof)
+
+    def __call__(self, input_configs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return self.combine(input_configs)
+
+    def combine(self, input_configs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Combine multiple dcm2bids config dicts, see `combine_config`."""
+        # the same config object may be passed more than once
+        by_id: Dict[int, str] = {}
+        for config in input_configs:
+            if id(config) not in by_id:
+                by_id[id(config)] = _fingerprint(config)
+        fingerprints = [by_id[id(config)] for config in input_configs]
+        params = self._top_level_params(input_configs, fingerprints)
+        return {
+            **params,
+            "descriptions": self._descriptions(input_configs, fingerprints),
+        }
+
+    def stats(self) -> Dict[str, CacheStats]:
+        return {"segments": self.segments.stats(), "params": self.params.stats()}
+
+    def clear(self) -> None:
+        self.segments.clear()
+        self.params.clear()
+
+    def _top_level_params(
+        self,
+        configs: List[Dict[str, Any]],
+        fingerprints: List[str],
+    ) -> Dict[str, Any]:
+        key = tuple(fingerprints)
+        blob: Optional[bytes] = self.params.get(key)
+        if blob is None:
+            blob = _pickle(ConfigCollection(configs).top_level_params())
+            self.params.put(key, blob)
+        return pickle.loads(blob)
+
+    def _descriptions(
+        self,
+        configs: List[Dict[str, Any]],
+        fingerprints: List[str],
+    ) -> List[Dict[str, Any]]:
+        combined: List[Dict[str, Any]] = []
+        seen_ids = set()
+        for i, offset, descriptions in ConfigCollection(configs).segments():
+            ids, blob = self._segment(descriptions, fingerprints[i], offset)
+            for desc_id in ids:
+                if desc_id in seen_ids:
+                    raise DescriptionIdError(desc_id)
+                seen_ids.add(desc_id)
+            combined.extend(pickle.loads(blob))
+
+        return combined
+
+    def _segment(
+        self,
+        descriptions: List[Dict[str, Any]],
+        fingerprint: str,
+        offset: int,
+    ) -> Tuple[Tuple[str, ...], bytes]:
+        key = (fingerprint, offset)
+        segment: Optional[Tuple[Tuple[str, ...], bytes]] = self.segments.get(key)
+        if segment is None:
+            ids = tuple(d["id"] for d in descriptions if isinstance(d.get("id"), str))
+            rebased = [update_intended_for(d, offset) for d in descriptions]
+            segment = (ids, _pickle(rebased))
+            self.segments.put(key, segment)
+        return segment
+
+    @staticmethod
+    def _sizeof(value: Union[bytes, Tuple[Tuple[str, ...], bytes]]) -> int:
+        if isinstance(value, bytes):
+            return len(value)
+        ids, blob = value
+        return len(blob) + sum(len(i) for i in ids)
+
+
+# --- ASYNCIO API ---
+
+T = TypeVar("T")
+
+
+async def _run_in_executor(
+    func: Callable[..., T],
+    *args: Any,
+    semaphore: Union[asyncio.Semaphore, None] = None,
+) -> T:
+    loop = asyncio.get_event_loop()
+    if semaphore is None:
+        return await loop.run_in_executor(None, func, *args)
+    async with semaphore:
+        return await loop.run_in_executor(None, func, *args)
+
+
+async def aload_config_file(
+    fp: Path,
+    semaphore: Union[asyncio.Semaphore, None] = None,
+) -> Dict[str, Any]:
+    """Asynchronous version of `load_config_file`.
+
+    Reading and parsing the file is offloaded to the default executor.
+
+    Args:
+        fp (Path): The JSON/YAML config file to load.
+        semaphore (asyncio.Semaphore | None): Optional semaphore bounding the
+            number of files being loaded at the same time.
+
+    Returns:
+        dict[str, Any]: The parsed config dict.
+    """
+    return await _run_in_executor(load_config_file, fp, semaphore=semaphore)
+
+
+async def acombine_config_files(
+    in_files: Sequence[Path],
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+) -> Dict[str, Any]:
+    """Load multiple config files concurrently and combine them.
+
+    At most `max_concurrency` files are read/parsed at the same time. Cancelling
+    the returned coroutine cancels any loads which haven't started yet. Loads
+    already running, and the combine step itself, run to completion in their
+    executor thread (their result is discarded), since threads can't be
+    interrupted.
+
+    Args:
+        in_files (Sequence[Path]): The JSON/YAML config files to combine.
+        max_concurrency (int): Maximum number of files loaded at the same time.
+
+    Returns:
+        dict[str, Any]: The combined/merged config dict.
+    """
+    if max_concurrency < 1:
+        raise ValueError(f"max_concurrency must be >= 1. Found [{max_concurrency}]")
+    semaphore = asyncio.Semaphore(max_concurrency)
+    tasks = [
+        asyncio.ensure_future(aload_config_file(fp, semaphore=semaphore))
+        for fp in in_files
+    ]
+    try:
+        configs = await asyncio.gather(*tasks)
+    finally:
+        # don't leave sibling loads running if one of them failed
+        for task in tasks:
+            task.cancel()
+    return await _run_in_executor(combine_config, list(configs))
+
+
+async def aserialize_config(
+    data: Dict[str, Any],
+    to_yaml: bool = False,
+    output_format: str = "json",
+) -> str:
+    """Asynchronous version of `serialize_config`.
+
+    Serialization is offloaded to the default executor.
+    """
+    return await _run_in_executor(serialize_config, data, to_yaml, output_format)
+
+
+async def aserialize_config_bytes(
+    data: Dict[str, Any],
+    output_format: str = "pickle",
+) -> bytes:
+    """Asynchronous version of `serialize_config_bytes`."""
+    return await _run_in_executor(serialize_config_bytes, data, output_format)
+
+
+# --- COMPILE SERVER ---
+
+
+TFileStamp = Tuple[int, int]
+
+_MAX_REQUEST_BYTES = 2 ** 24
+
+
+class CompileService:
+    """Combines config files, keeping parsed inputs and recent outputs in memory.
+
+    Parsed input files are kept in an LRU cache (bounded by `max_inputs`) and
+    reused until their modification time (or size) changes. Combined outputs
+    are kept in an LRU cache keyed by the stamps of the input files (and the
+    output options). Both caches are thread-safe, so requests are compiled
+    concurrently.
+
+    If `roots` are given, only input files (after resolving symlinks) under one
+    of these directories are read; otherwise any file readable by the server is.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = DEFAULT_CACHE_ENTRIES,
+        max_bytes: Optional[int] = DEFAULT_CACHE_BYTES,
+        max_inputs: Optional[int] = DEFAULT_INPUT_CACHE_ENTRIES,
+        roots: Optional[Sequence[Path]] = None,
+    ):
+        self.results = LRUCache(max_entries, max_bytes, sizeof=len)
+        self.inputs = LRUCache(max_inputs)
+        self.roots = None if roots is None else [Path(r).resolve() for r in roots]
+
+    def compile(
+        self,
+        in_files: Sequence[Path],
+        to_yaml: bool = False,
+        output_format: str = "json",
+    ) -> str:
+        output_format = _resolve_output_format(to_yaml, output_format)
+        if output_format not in TEXT_OUTPUT_FORMATS:
+            raise ValueError("The compile server only produces text output formats")
+        stamped = [self._load(fp) for fp in in_files]
+        files_key = tuple((str(fp), stamp) for fp, stamp, _ in stamped)
+        key = (files_key, output_format)
+        output: Optional[str] = self.results.get(key)
+        if output is None:
+            combined = combine_config([config for _, _, config in stamped])
+            output = serialize_config(combined, output_format=output_format)
+            self.results.put(key, output)
+        return output
+
+    def _load(self, fp: Path) -> Tuple[Path, TFileStamp, Dict[str, Any]]:
+        path = fp.resolve()
+        if self.roots is not None and not any(
+            path == root or root in path.parents for root in self.roots
+        ):
+            raise InputOutsideRootError(path)
+        if path.suffix in PICKLE_SUFFIXES:
+            # never unpickle files named by (unauthenticated) clients
+            raise PickleLoadError(path)
+        try:
+            st = path.stat()
+        except OSError:
+            self.inputs.discard(path)  # e.g. the file was deleted
+            raise
+        stamp = (st.st_mtime_ns, st.st_size)
+        cached: Optional[Tuple[TFileStamp, Dict[str, Any]]] = self.inputs.get(path)
+        if cached is not None and cached[0] == stamp:
+            return path, stamp, cached[1]
+        config = load_config_file(path)
+        self.inputs.put(path, (stamp, config))
+        return path, stamp, config
+
+
+def _is_loopback(host: Optional[str]) -> bool:
+    if host in (None, "localhost"):
+        return True
+    try:
+        return ipaddress.ip_address(str(host)).is_loopback
+    except ValueError:
+        return False
+
+
+async def start_compile_server(
+    service: CompileService,
+    host: Optional[str] = "127.0.0.1",
+    port: Optional[int] = None,
+    path: Union[str, Path, None] = None,
+):
+    """Start serving compile requests on a Unix socket (`path`) or TCP port.
+
+    The protocol is newline-delimited JSON. Each request is an object like
+    `{"in_files": ["a.json", "b.yaml"], "to_yaml": false, "cwd": "/some/dir"}`
+    (`to_yaml`, `format` and `cwd` are optional; relative paths are resolved
+    against `cwd`; `format` is one of the text `OUTPUT_FORMATS`). Each response
+    is either `{"output": "<combined config>"}` or
+    `{"error": "<message>", "type": "<exception name>"}`.
+
+    The server is unauthenticated, so it only listens on loopback hosts, and
+    the Unix socket is only accessible to the user running the server (0o600).
+    On a TCP port, any local user can connect and have the server read files
+    on their behalf; restrict it with `CompileService(roots=...)`.
+
+    Returns:
+        asyncio.AbstractServer: The (already listening) server.
+    """
+    handler = functools.partial(_handle_connection, service)
+    if path is not None:
+        if not hasattr(asyncio, "start_unix_server"):  # pragma: no cover
+            raise ValueError("Unix sockets are not supported on this platform")
+        return await asyncio.start_unix_server(
+            handler,
+            sock=_bind_unix_socket(Path(path)),
+            limit=_MAX_REQUEST_BYTES,
+        )
+    if not _is_loopback(host):
+        raise ValueError(f"Refusing to listen on non-loopback host [{host}]")
+    return await asyncio.start_server(handler, host, port, limit=_MAX_REQUEST_BYTES)
+
+
+def _bind_unix_socket(path: Path) -> socket.socket:
+    # restrict the permissions before listen(), so no one else can ever connect
+    try:
+        if stat.S_ISSOCK(path.stat().st_mode):
+            path.unlink()  # stale socket from a previous run
+    except FileNotFoundError:
+        pass
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.bind(str(path))
+        os.chmod(str(path), 0o600)
+        sock.listen(100)
+    except BaseException:
+        sock.close()
+        raise
+    return sock
+
+
+async def _handle_connection(
+    service: CompileService,
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+):
+    try:
+        while True:
+            try:
+                line = await reader.readline()
+            except (ValueError, asyncio.LimitOverrunError):
+                # the stream is no longer at a request boundary, so give up on it
+                msg = f"Request exceeds the limit of {_MAX_REQUEST_BYTES} bytes"
+                response = {"error": msg, "type": "LimitOverrunError"}
+                writer.write(json.dumps(response).encode("utf8") + b"\n")
+                await writer.drain()
+                break
+            if not line:
+                break
+            response = await _handle_request(service, line)
+            writer.write(json.dumps(response).encode("utf8") + b"\n")
+            await writer.drain()
+    finally:
+        writer.close()
+
+
+async def _handle_request(service: CompileService, line: bytes) -> Dict[str, Any]:
+    try:
+        request = json.loads(line)
+        in_files = request.get("in_files") if isinstance(request, dict) else None
+        if not isinstance(in_files, list):
+            raise ValueError("Request must be an object with an 'in_files' list")
+        cwd = Path(request.get("cwd") or os.getcwd())
+        in_files = [cwd / fp for fp in in_files]
+        to_yaml = bool(request.get("to_yaml", False))
+        output_format = str(request.get("format", "json"))
+        output = await _run_in_executor(
+            service.compile,
+            in_files,
+            to_yaml,
+            output_format,
+        )
+    except Exception as e:
+        return {"error": str(e), "type": type(e).__name__}
+    return {"output": output}
+
+
+# --- CRITERIA MATCHING ---
+
+
+SEARCH_METHODS = ("fnmatch", "re")
+
+TMatcher = Callable[[Any], bool]
+TRegexMatch = Callable[[str], Any]
+
+_GLOB_CHARS = frozenset("*?[")
+# global inline flags (e.g. "(?i)") change the meaning of the whole alternation
+_INLINE_FLAGS = re.compile(r"\(\?[aiLmsux]+\)")
+
+
+def _compile_regex(
+    pattern: str,
+    search_method: str = "fnmatch",
+    case_sensitive: bool = True,
+) -> TRegexMatch:
+    flags = 0 if case_sensitive else re.IGNORECASE
+    if search_method == "re":
+        return re.compile(pattern, flags).search
+    return re.compile(fnmatch.translate(pattern), flags).match
+
+
+def _compile_pattern(
+    pattern: Any,
+    search_method: str = "fnmatch",
+    case_sensitive: bool = True,
+) -> TMatcher:
+    # same semantics as dcm2bids: patterns are matched against the str() of the
+    # sidecar value (as globs, or with re.search), list patterns match element-wise
+    if isinstance(pattern, list):
+        matchers = [_compile_pattern(p, search_method, case_sensitive) for p in pattern]
+
+        def match_list(value: Any) -> bool:
+            return (
+                isinstance(value, list)
+                and len(value) == len(matchers)
+                and all(m(v) for m, v in zip(matchers, value))
+            )
+
+        return match_list
+
+    regex_match = _compile_regex(str(pattern), search_method, case_sensitive)
+
+    def match(value: Any) -> bool:
+        return not isinstance(value, list) and regex_match(str(value)) is not None
+
+    return match
+
+
+def _pattern_key(pattern: Any) -> Hashable:
+    if isinstance(pattern, list):
+        return tuple(_pattern_key(p) for p in pattern)
+    return str(pattern)
+
+
+class _KeyIndex:
+    """The distinct patterns of one criteria key, bucketed by what they can match.
+
+    Glob patterns without wildcards are looked up by value, glob patterns
+    starting with a literal character are only tried on values starting with
+    that character, and the remaining patterns are joined into one alternation
+    which is tried first, so a value matching none of them skips them all.
+    """
+
+    def __init__(
+        self,
+        patterns: List[Tuple[Any, List[int]]],
+        search_method: str = "fnmatch",
+        case_sensitive: bool = True,
+    ):
+        self._fold: Callable[[str], str] = str if case_sensitive else str.lower
+        self._n_patterns = len(patterns)
+        self._literal: Dict[str, List[int]] = {}
+        self._by_first: Dict[str, List[Tuple[TRegexMatch, List[int]]]] = {}
+        self._scan: List[Tuple[TRegexMatch, List[int]]] = []
+        self._lists: List[Tuple[TMatcher, List[int]]] = []
+        scan_regexes: List[str] = []
+        for pattern, indices in patterns:
+            if isinstance(pattern, list):
+                matcher = _compile_pattern(pattern, search_method, case_sensitive)
+                self._lists.append((matcher, indices))
+                continue
+            pattern = str(pattern)
+            regex_match = _compile_regex(pattern, search_method, case_sensitive)
+            if search_method == "re":
+                self._scan.append((regex_match, indices))
+                scan_regexes.append(pattern)
+            elif not _GLOB_CHARS.intersection(pattern):
+                self._literal.setdefault(self._fold(pattern), []).extend(indices)
+            elif pattern[0] not in _GLOB_CHARS:
+                bucket = self._by_first.setdefault(self._fold(pattern[0]), [])
+                bucket.append((regex_match, indices))
+            else:
+                self._scan.append((regex_match, indices))
+                scan_regexes.append(fnmatch.translate(pattern))
+        self._prefilter = self._compile_prefilter(
+            scan_regexes,
+            search_method,
+            case_sensitive,
+        )
+
+    @staticmethod
+    def _compile_prefilter(
+        regexes: List[str],
+        search_method: str,
+        case_sensitive: bool,
+    ) -> Optional[TRegexMatch]:
+        if len(regexes) < 2:
+            return None
+        alternation = "|".join(f"(?:{r})" for r in regexes)
+        flags = 0 if case_sensitive else re.IGNORECASE
+        if search_method != "re":
+            # fnmatch.translate() output is self-contained (anchored with \Z,
+            # uniquely named or atomic groups), so these join safely
+            return re.compile(alternation, flags).match
+        # user regexes may use (back)references to groups or global flags,
+        # which don't survive being joined together
+        if any(_INLINE_FLAGS.search(r) or re.compile(r).groups for r in regexes):
+            return None
+        try:
+            return re.compile(alternation, flags).search
+        except re.error:
+            return None
+
+    def __len__(self) -> int:
+        return self._n_patterns
+
+    def matches(self, value: Any) -> Iterator[List[int]]:
+        """Yield the description indices of each pattern matching `value`."""
+        for matcher, indices in self._lists:
+            if matcher(value):
+                yield indices
+        if not isinstance(value, list):
+            yield from self._matches_str(str(value))
+
+    def _matches_str(self, s: str) -> Iterator[List[int]]:
+        folded = self._fold(s)
+        if folded in self._literal:
+            yield self._literal[folded]
+        if s:
+            for regex_match, indices in self._by_first.get(folded[0], ()):
+                if regex_match(s) is not None:
+                    yield indices
+        if self._scan and (self._prefilter is None or self._prefilter(s) is not None):
+            for regex_match, indices in self._scan:
+                if regex_match(s) is not None:
+                    yield indices
+
+
+class CriteriaIndex:
+    """Precompiled index of the `criteria` of a config's descriptions.
+
+    Every distinct (criteria key, pattern) pair is compiled to a regex once and
+    evaluated at most once per sidecar, no matter how many descriptions use it.
+    Per key, patterns are bucketed (see `_KeyIndex`) so a sidecar is only
+    checked against the patterns which could match it.
+
+    Args:
+        descriptions (list[dict[str, Any]]): The descriptions to index.
+        search_method (str): How patterns are matched; "fnmatch" (globs) or "re"
+            (`re.search`), as with the `searchMethod` config param.
+        case_sensitive (bool): Whether patterns are matched case-sensitively, as
+            with the `caseSensitive` config param.
+    """
+
+    def __init__(
+        self,
+        descriptions: List[Dict[str, Any]],
+        search_method: str = "fnmatch",
+        case_sensitive: bool = True,
+    ):
+        if search_method not in SEARCH_METHODS:
+            m = f"Unknown search method [{search_method}]"
+            raise ValueError(m)
+        self._required: List[int] = []
+        self._always: List[int] = []
+        by_key: Dict[str, Dict[Hashable, Tuple[Any, List[int]]]] = {}
+        for i, description in enumerate(descriptions):
+            criteria: Dict[str, Any] = description.get("criteria") or {}
+            self._required.append(len(criteria))
+            if not criteria:
+                self._always.append(i)
+            for key, pattern in criteria.items():
+                patterns = by_key.setdefault(key, {})
+                entry = patterns.setdefault(_pattern_key(pattern), (pattern, []))
+                entry[1].append(i)
+        self._index: Dict[str, _KeyIndex] = {
+            key: _KeyIndex(list(patterns.values()), search_method, case_sensitive)
+            for key, patterns in by_key.items()
+        }
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "CriteriaIndex":
+        return cls(
+            config.get("descriptions") or [],
+            search_method=config.get("searchMethod", "fnmatch"),
+            case_sensitive=config.get("caseSensitive", True),
+        )
+
+    def match(self, sidecar: Dict[str, Any]) -> List[int]:
+        """Return the (sorted) indices of the descriptions matching `sidecar`."""
+        hits: Dict[int, int] = {}
+        for key, key_index in self._index.items():
+            for indices in key_index.matches(sidecar.get(key, "")):
+                for i in indices:
+                    hits[i] = hits.get(i, 0) + 1
+        matched = [i for i, n in hits.items() if n == self._required[i]]
+        return sorted(matched + self._always)
+
+
+def load_sidecar(fp: Path) -> Dict[str, Any]:
+    sidecar = json.loads(fp.read_text())
+    if not isinstance(sidecar, dict):
+        m = f"Sidecar [{fp}] must contain a JSON object"
+        raise ValueError(m)
+    sidecar.setdefault("SidecarFilename", fp.stem)
+    return sidecar
+
+
+@dataclass
+class SidecarMatch:
+    path: Path
+    indices: List[int]
+    error: Optional[str] = None
+
+
+def match_sidecars(
+    config: Dict[str, Any],
+    sidecar_files: Iterable[Path],
+    jobs: Optional[int] = DEFAULT_MAX_CONCURRENCY,
+) -> List[SidecarMatch]:
+    """Find the descriptions of `config` which match each sidecar file.
+
+    Sidecars which can't be read or parsed (or don't contain a JSON object)
+    don't match anything and have their `error` set instead.
+
+    Args:
+        config (dict[str, Any]): A (combined) dcm2bids config dict.
+        sidecar_files (Iterable[Path]): The sidecar JSON files to check.
+        jobs (int | None): Number of sidecar files loaded/matched in parallel.
+
+    Returns:
+        list[SidecarMatch]: Each sidecar file with the indices of the
+            descriptions it matches, in the order they were given.
+    """
+    index = CriteriaIndex.from_config(config)
+
+    def match(fp: Path) -> SidecarMatch:
+        try:
+            sidecar = load_sidecar(fp)
+        except (OSError, ValueError) as e:  # incl. JSONDecodeError
+            return SidecarMatch(fp, [], f"could not be loaded: {e}")
+        return SidecarMatch(fp, index.match(sidecar))
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(match, sidecar_files))
+
+
+# --- VALIDATION ---
+
+
+@dataclass
+class ValidationIssue:
+    source: str
+    index: Optional[int]
+    field: str
+    message: str
+
+    def __str__(self) -> str:
+        location = self.source if self.index is None else f"{self.source}:{self.index}"
+        return f"{location}: {self.field}: {self.message}"
+
+
+# (value, number of descriptions in the config) -> error message or None
+TCheck = Callable[[Any, int], Optional[str]]
+
+_SCALARS = (str, int, float, bool)
+
+_PARSE_ERRORS: Tuple[Type[Exception], ...] = (json.JSONDecodeError, UnicodeDecodeError)
+if yaml is not None:
+    _PARSE_ERRORS += (yaml.YAMLError,)
+
+
+def _check_non_empty_str(value: Any, n: int) -> Optional[str]:
+    if not isinstance(value, str) or not value:
+        return f"must be a non-empty string. Found [{value!r}]"
+    return None
+
+
+def _check_str(value: Any, n: int) -> Optional[str]:
+    if not isinstance(value, str):
+        return f"must be a string. Found [{value!r}]"
+    return None
+
+
+def _check_dict(value: Any, n: int) -> Optional[str]:
+    if not isinstance(value, dict):
+        return f"must be an object. Found [{value!r}]"
+    return None
+
+
+def _check_criteria(value: Any, n: int) -> Optional[str]:
+    if not isinstance(value, dict) or not value:
+        return f"must be a non-empty object. Found [{value!r}]"
+    for key, pattern in value.items():
+        patterns = pattern if isinstance(pattern, list) else [pattern]
+        if not all(isinstance(p, _SCALARS) for p in patterns):
+            return (
+                f"[{key!r}] must be a pattern or list of patterns. Found [{pattern!r}]"
+            )
+    return None
+
+
+def _check_intended_for(value: Any, n: int) -> Optional[str]:
+    targets = value if isinstance(value, list) else [value]
+    for target in targets:
+        if isinstance(target, bool) or not isinstance(target, (int, str)):
+            return f"must be int, str or (int | str)[]. Found [{value!r}]"
+        if isinstance(target, int) and not 0 <= target < n:
+            return f"index [{target}] is out of range for {n} descriptions"
+    return None
+
+
+# field -> (required, check)
+DESCRIPTION_SCHEMA: Dict[str, Tuple[bool, TCheck]] = {
+    "dataType": (True, _check_non_empty_str),
+    "modalityLabel": (True, _check_non_empty_str),
+    "customLabels": (False, _check_str),
+    "criteria": (True, _check_criteria),
+    "sidecarChanges": (False, _check_dict),
+    "IntendedFor": (False, _check_intended_for),
+    "id": (False, _check_non_empty_str),
+}
+
+
+def _compile_schema(
+    schema: Dict[str, Tuple[bool, TCheck]],
+) -> Callable[[Any, int], Iterator[Tuple[str, str]]]:
+    required = tuple(k for k, (req, _) in schema.items() if req)
+    checks = tuple((k, check) for k, (_, check) in schema.items())
+
+    def check_description(description: Any, n: int) -> Iterator[Tuple[str, str]]:
+        if not isinstance(description, dict):
+            yield "description", f"must be an object. Found [{description!r}]"
+            return
+        for key in required:
+            if key not in description:
+                yield key, "is required"
+        for key, check in checks:
+            if key in description:
+                message = check(description[key], n)
+                if message is not None:
+                    yield key, message
+
+    return check_description
+
+
+_check_description = _compile_schema(DESCRIPTION_SCHEMA)
+
+
+def _iter_issues(config: Any, source: str) -> Iterator[ValidationIssue]:
+    if not isinstance(config, dict):
+        yield ValidationIssue(source, None, "config", "must be an object")
+        return
+    descriptions = config.get("descriptions")
+    if descriptions is None:  # no descriptions, like combine_config
+        return
+    if not isinstance(descriptions, list):
+        yield ValidationIssue(source, None, "descriptions", "must be a list")
+        return
+    n = len(descriptions)
+    for i, description in enumerate(descriptions):
+        for key, message in _check_description(description, n):
+            yield ValidationIssue(source, i, key, message)
+
+
+def _iter_duplicate_id_issues(
+    configs: Sequence[Any],
+    sources: Sequence[str],
+) -> Iterator[ValidationIssue]:
+    seen_ids = set()
+    for config, source in zip(configs, sources):
+        descriptions = config.get("descriptions") if isinstance(config, dict) else None
+        for i, description in enumerate(descriptions or []):
+            desc_id = description.get("id") if isinstance(description, dict) else None
+            if isinstance(desc_id, str) and desc_id in seen_ids:
+                yield ValidationIssue(source, i, "id", f"duplicate ID [{desc_id!r}]")
+            elif isinstance(desc_id, str):
+                seen_ids.add(desc_id)
+
+
+def validate_config(
+    config: Dict[str, Any],
+    source: str = "<config>",
+    fail_fast: bool = False,
+) -> List[ValidationIssue]:
+    """Validate the descriptions of a single dcm2bids config dict.
+
+    Args:
+        config (dict[str, Any]): The config to validate.
+        source (str): Name of the config (e.g. its file path) used in the issues.
+        fail_fast (bool): Stop at (and return) the first issue found.
+
+    Returns:
+        list[ValidationIssue]: All the problems found, empty if the config is valid.
+    """
+    issues = _iter_issues(config, source)
+    return list(itertools.islice(issues, 1) if fail_fast else issues)
+
+
+def validate_configs(
+    configs: Sequence[Dict[str, Any]],
+    sources: Optional[Sequence[str]] = None,
+    fail_fast: bool = False,
+) -> List[ValidationIssue]:
+    """Validate multiple configs, including that description IDs are unique.
+
+    Args:
+        configs (Sequence[dict[str, Any]]): The configs to validate.
+        sources (Sequence[str] | None): Names of the configs, defaults to
+            'config[<position>]'.
+        fail_fast (bool): Stop at (and return) the first issue found.
+
+    Returns:
+        list[ValidationIssue]: All the problems found, empty if the configs are valid.
+    """
+    _sources = sources or [f"config[{i}]" for i in range(len(configs))]
+    issues = itertools.chain(
+        itertools.chain.from_iterable(map(_iter_issues, configs, _sources)),
+        _iter_duplicate_id_issues(configs, _sources),
+    )
+    return list(itertools.islice(issues, 1) if fail_fast else issues)
+
+
+def validate_config_files(
+    in_files: Sequence[Path],
+    fail_fast: bool = False,
+    jobs: Optional[int] = DEFAULT_MAX_CONCURRENCY,
+) -> List[ValidationIssue]:
+    """Load and validate config files, `jobs` files at a time.
+
+    Files which can't be read or parsed (including pickle files, and YAML files
+    without PyYAML installed) are reported as a 'file' issue. With `fail_fast`
+    the first issue found (in whichever file finishes first) is returned without
+    waiting for, and cancelling, the remaining files.
+
+    Returns:
+        list[ValidationIssue]: All the problems found, empty if the files are valid.
+    """
+
+    def load_and_validate(
+        fp: Path,
+    ) -> Tuple[Optional[Dict[str, Any]], List[ValidationIssue]]:
+        try:
+            config = load_config_file(fp)
+        except _PARSE_ERRORS as e:
+            message = f"could not be parsed: {e}"
+            return None, [ValidationIssue(str(fp), None, "file", message)]
+        except (OSError, PickleLoadError, YamlParserNotFoundError) as e:
+            message = f"could not be loaded: {e}"
+            return None, [ValidationIssue(str(fp), None, "file", message)]
+        return config, validate_config(config, str(fp), fail_fast)
+
+    executor = ThreadPoolExecutor(max_workers=jobs)
+    futures = [executor.submit(load_and_validate, fp) for fp in in_files]
+    try:
+        if fail_fast:
+            for future in as_completed(futures):
+                _, file_issues = future.result()
+                if file_issues:
+                    return file_issues
+        results = [future.result() for future in futures]
+    finally:
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+    issues = [issue for _, file_issues in results for issue in file_issues]
+    parsed = [(c, str(fp)) for (c, _), fp in zip(results, in_files) if c is not None]
+    duplicates = _iter_duplicate_id_issues(
+        [config for config, _ in parsed],
+        [source for _, source in parsed],
+    )
+    return issues + list(itertools.islice(duplicates, 1) if fail_fast else duplicates)
+
+
+# --- DIFF ---
+
+
+_canonical_json = json.JSONEncoder(
+    sort_keys=True,
+    separators=(",", ":"),
+    default=str,
+).encode
+
+_IDENTITY_LABELS = ("dataType", "modalityLabel", "customLabels")
+
+
+def _hash(obj: Any) -> str:
+    data = _canonical_json(obj).encode("utf8")
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _identity(description: Dict[str, Any]) -> str:
+    # what a description "is", regardless of its criteria, sidecarChanges etc.
+    desc_id = description.get("id")
+    if isinstance(desc_id, str):
+        return f"id:{desc_id}"
+    labels = [description.get(k) for k in _IDENTITY_LABELS]
+    return f"labels:{_canonical_json(labels)}"
+
+
+def _duplicate_ids(descriptions: List[Dict[str, Any]]) -> List[str]:
+    seen_ids = set()
+    duplicates: Dict[str, None] = {}
+    for d in descriptions:
+        desc_id = d.get("id")
+        if isinstance(desc_id, str) and desc_id in seen_ids:
+            duplicates[desc_id] = None
+        elif isinstance(desc_id, str):
+            seen_ids.add(desc_id)
+    return list(duplicates)
+
+
+def _repeated(keys: Iterable[str]) -> Set[str]:
+    seen: Set[str] = set()
+    repeated: Set[str] = set()
+    for key in keys:
+        (repeated if key in seen else seen).add(key)
+    return repeated
+
+
+class _HashedDescriptions:
+    """Content hashes of descriptions, with `IntendedFor` indices normalized.
+
+    Indices shift whenever descriptions are added or removed earlier in the
+    config, so they're replaced by the identity of the target: its id or,
+    failing that, its (dataType, modalityLabel, customLabels). Editing the
+    target's criteria therefore doesn't change the descriptions pointing at it.
+    `ambiguous` identities (shared by several descriptions, e.g. runs of the
+    same task) are qualified with the hash of the target's content, so
+    retargeting from one to another is still a change.
+    """
+
+    def __init__(
+        self,
+        descriptions: List[Dict[str, Any]],
+        identities: List[str],
+        ambiguous: Set[str],
+    ):
+        self.descriptions = descriptions
+        self.identities = identities
+        self._targets: List[str] = []
+        seen: Dict[str, int] = {}
+        for d, key in zip(descriptions, identities):
+            if key in ambiguous:
+                content = {k: v for k, v in d.items() if k != "IntendedFor"}
+                key = f"{key}#{_hash(content)}"
+                seen[key] = seen.get(key, 0) + 1
+                if seen[key] > 1:  # identical siblings, fall back to position
+                    key = f"{key}#{seen[key]}"
+            self._targets.append(key)
+        self.hashes = [
+            (
+                _hash(d)
+                if "IntendedFor" not in d
+                else _hash(
+                    [
+                        {k: v for k, v in d.items() if k != "IntendedFor"},
+                        self._intended_for(d),
+                    ]
+                )
+            )
+            for d in descriptions
+        ]
+
+    def normalized(self, index: int) -> Dict[str, Any]:
+        description = dict(self.descriptions[index])
+        if "IntendedFor" in description:
+            description["IntendedFor"] = self._intended_for(description)
+        return description
+
+    def _intended_for(self, description: Dict[str, Any]) -> Any:
+        intended_for = description["IntendedFor"]
+        if isinstance(intended_for, list):
+            return [self._ref(t) for t in intended_for]
+        return self._ref(intended_for)
+
+    def _ref(self, target: Any) -> Any:
+        if isinstance(target, str):
+            return f"id:{target}"
+        if isinstance(target, int) and 0 <= target < len(self.descriptions):
+            return self._targets[target]
+        return target
+
+
+@dataclass
+class DescriptionChange:
+    old_index: int
+    new_index: int
+    fields: List[str]
+
+
+@dataclass
+class ConfigDiff:
+    """Semantic differences between two configs.
+
+    Descriptions with an `id` are matched by ID, all others by content, and
+    leftovers with the same identity (id, or dataType/modalityLabel/customLabels)
+    are reported as changed. Description indices refer to the old config for
+    removed descriptions and to the new config for added ones. IDs used by more
+    than one description are listed in `old_duplicate_ids`/`new_duplicate_ids`;
+    these are warnings rather than differences.
+    """
+
+    added: List[int] = field(default_factory=list)
+    removed: List[int] = field(default_factory=list)
+    changed: List[DescriptionChange] = field(default_factory=list)
+    params_added: Dict[str, Any] = field(default_factory=dict)
+    params_removed: Dict[str, Any] = field(default_factory=dict)
+    params_changed: Dict[str, Tuple[Any, Any]] = field(default_factory=dict)
+    old_duplicate_ids: List[str] = field(default_factory=list)
+    new_duplicate_ids: List[str] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(
+            self.added
+            or self.removed
+            or self.changed
+            or self.params_added
+            or self.params_removed
+            or self.params_changed
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "added": self.added,
+            "removed": self.removed,
+            "changed": [vars(c) for c in self.changed],
+            "params_added": self.params_added,
+            "params_removed": self.params_removed,
+            "params_changed": {
+                k: {"old": old, "new": new}
+                for k, (old, new) in self.params_changed.items()
+            },
+            "old_duplicate_ids": self.old_duplicate_ids,
+            "new_duplicate_ids": self.new_duplicate_ids,
+        }
+
+    def format(self, old: Dict[str, Any], new: Dict[str, Any]) -> Iterator[str]:
+        """Yield human-readable lines describing the differences."""
+        old_descriptions = old.get("descriptions") or []
+        new_descriptions = new.get("descriptions") or []
+        for desc_id in self.old_duplicate_ids:
+            yield f"! duplicate id in old config: {desc_id!r}"
+        for desc_id in self.new_duplicate_ids:
+            yield f"! duplicate id in new config: {desc_id!r}"
+        for k, v in self.params_removed.items():
+            yield f"- param {k}: {v!r}"
+        for k, v in self.params_added.items():
+            yield f"+ param {k}: {v!r}"
+        for k, (old_value, new_value) in self.params_changed.items():
+            yield f"~ param {k}: {old_value!r} -> {new_value!r}"
+        for i in self.removed:
+            yield f"- [{i}] {_label(old_descriptions[i])}"
+        for i in self.added:
+            yield f"+ [{i}] {_label(new_descriptions[i])}"
+        for c in self.changed:
+            label = _label(new_descriptions[c.new_index])
+            fields = ", ".join(c.fields)
+            yield f"~ [{c.old_index} -> {c.new_index}] {label} ({fields})"
+
+
+def _diff_params(old: Dict[str, Any], new: Dict[str, Any], config_diff: ConfigDiff):
+    for k, v in old.items():
+        if k == "descriptions":
+            continue
+        if k not in new:
+            config_diff.params_removed[k] = v
+        elif new[k] != v:
+            config_diff.params_changed[k] = (v, new[k])
+    for k, v in new.items():
+        if k != "descriptions" and k not in old:
+            config_diff.params_added[k] = v
+
+
+def _description_change(
+    old_hashed: _HashedDescriptions,
+    new_hashed: _HashedDescriptions,
+    i: int,
+    j: int,
+) -> DescriptionChange:
+    o, n = old_hashed.normalized(i), new_hashed.normalized(j)
+    keys = sorted(set(o) | set(n), key=str)
+    return DescriptionChange(i, j, [k for k in keys if o.get(k) != n.get(k)])
+
+
+def _match_descriptions(
+    old_hashed: _HashedDescriptions,
+    new_hashed: _HashedDescriptions,
+    config_diff: ConfigDiff,
+) -> Tuple[List[int], List[int]]:
+    # match by id, then by content; return the unmatched (old, new) indices
+    old_by_id: Dict[str, Deque[int]] = {}
+    old_by_hash: Dict[str, Deque[int]] = {}
+    for i, d in enumerate(old_hashed.descriptions):
+        if isinstance(d.get("id"), str):
+            old_by_id.setdefault(d["id"], deque()).append(i)
+        else:
+            old_by_hash.setdefault(old_hashed.hashes[i], deque()).append(i)
+
+    unmatched_new: List[int] = []
+    for j, d in enumerate(new_hashed.descriptions):
+        desc_id = d.get("id")
+        # (duplicates are matched in order of appearance)
+        if isinstance(desc_id, str) and old_by_id.get(desc_id):
+            i = old_by_id[desc_id].popleft()
+            if old_hashed.hashes[i] != new_hashed.hashes[j]:
+                change = _description_change(old_hashed, new_hashed, i, j)
+                config_diff.changed.append(change)
+        elif not isinstance(desc_id, str) and old_by_hash.get(new_hashed.hashes[j]):
+            old_by_hash[new_hashed.hashes[j]].popleft()
+        else:
+            unmatched_new.append(j)
+
+    unmatched_old = itertools.chain(*old_by_id.values(), *old_by_hash.values())
+    return sorted(unmatched_old), unmatched_new
+
+
+def diff_configs(old: Dict[str, Any], new: Dict[str, Any]) -> ConfigDiff:
+    """Find the semantic differences between two (combined) configs.
+
+    Each description is hashed with its `IntendedFor` indices replaced by the
+    identity of their targets, so descriptions which merely moved (shifting the
+    indices pointing at them) aren't reported. Descriptions are matched by id,
+    then by content; those left over are paired up by identity (id, or
+    dataType/modalityLabel/customLabels) and reported as changed, the rest as
+    added or removed. Runs in linear time.
+
+    Args:
+        old (dict[str, Any]): The previous config.
+        new (dict[str, Any]): The new config.
+
+    Returns:
+        ConfigDiff: The added, removed and changed descriptions and top-level
+            parameters.
+    """
+    config_diff = ConfigDiff()
+    _diff_params(old, new, config_diff)
+
+    old_descriptions: List[Dict[str, Any]] = old.get("descriptions") or []
+    new_descriptions: List[Dict[str, Any]] = new.get("descriptions") or []
+    old_identities = [_identity(d) for d in old_descriptions]
+    new_identities = [_identity(d) for d in new_descriptions]
+    # decided across both configs, so adding a sibling doesn't change how the
+    # existing references are written
+    ambiguous = _repeated(old_identities) | _repeated(new_identities)
+    old_hashed = _HashedDescriptions(old_descriptions, old_identities, ambiguous)
+    new_hashed = _HashedDescriptions(new_descriptions, new_identities, ambiguous)
+    config_diff.old_duplicate_ids = _duplicate_ids(old_hashed.descriptions)
+    config_diff.new_duplicate_ids = _duplicate_ids(new_hashed.descriptions)
+
+    unmatched_old, unmatched_new = _match_descriptions(
+        old_hashed,
+        new_hashed,
+        config_diff,
+    )
+    old_by_identity: Dict[str, Deque[int]] = {}
+    for i in unmatched_old:
+        old_by_identity.setdefault(old_hashed.identities[i], deque()).append(i)
+    for j in unmatched_new:
+        candidates = old_by_identity.get(new_hashed.identities[j])
+        if candidates:
+            i = candidates.popleft()
+            change = _description_change(old_hashed, new_hashed, i, j)
+            config_diff.changed.append(change)
+        else:
+            config_diff.added.append(j)
+
+    config_diff.removed = sorted(itertools.chain(*old_by_identity.values()))
+    config_diff.changed.sort(key=lambda c: c.new_index)
+
+    return config_diff
+
+
 def yaml_dumper_factory():
     if yaml is None:
         msg = "Trying to create YAML Dumper class but PyYAML is not installed"
@@ -216,6 +1979,29 @@ class DescriptionIdError(ConfigurationConflictError):
         super().__init__(f"Found multiple descriptions with ID [{description_id!r}]")
 
 
+class ConfigValidationError(ValueError):
+    def __init__(self, issues: List[ValidationIssue]):
+        self.issues = issues
+        details = "\n".join(f"  {issue}" for issue in issues)
+        super().__init__(f"Found {len(issues)} problem(s) in the configs:\n{details}")
+
+
+class PickleLoadError(ValueError):
+    def __init__(self, fp: Path):
+        self.fp = fp
+        super().__init__(
+            f"Refusing to load pickle file [{fp}]. Unpickling can run arbitrary "
+            "code, load trusted files explicitly with 'load_pickle_config' (or "
+            "pass '--allow-pickle' on the command line)",
+        )
+
+
+class InputOutsideRootError(ValueError):
+    def __init__(self, fp: Path):
+        self.fp = fp
+        super().__init__(f"Input file [{fp}] is outside the allowed root directories")
+
+
 class YamlParserNotFoundError(ValueError):
     def __init__(self, msg: Union[str, None]):
         default_message = "Trying to process YAML data with no YAML parser installed"
@@ -247,5 +2033,14 @@ class YamlDumpError(YamlParserNotFoundError):
         )
 
 
+_PROG = "compile-dcm2bids-config"
+_SUBCOMMANDS: Dict[str, Callable[[], argparse.ArgumentParser]] = {
+    "serve": _create_serve_parser,
+    "match": _create_match_parser,
+    "validate": _create_validate_parser,
+    "diff": _create_diff_parser,
+}
+
+
 if __name__ == "__main__":
     raise SystemExit(main())  # pragma: no cover
@@ -0,0 +1,97 @@
+import asyncio
+import json
+import time
+from pathlib import Path
+
+import pytest
+from compile_dcm2bids_config import acombine_config_files
+from compile_dcm2bids_config import aload_config_file
+from compile_dcm2bids_config import aserialize_config
+from compile_dcm2bids_config import load_config_file
+from compile_dcm2bids_config import serialize_config
+from pytest_mock import MockerFixture
+
+
+def _run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def test_aload_config_file(datadir: Path):
+    config_file = datadir / "config1.json"
+    assert _run(aload_config_file(config_file)) == load_config_file(config_file)
+
+
+def test_acombine_config_files(datadir: Path):
+    in_files = [datadir / "config1.json", datadir / "config2.json"]
+    expected = json.loads((datadir / "merged_config1_config2.json").read_text())
+
+    assert _run(acombine_config_files(in_files)) == expected
+
+
+def test_acombine_config_files_with_yaml_input(datadir: Path):
+    in_files = [datadir / "config1.json", datadir / "config3.yaml"]
+    expected = json.loads((datadir / "merged_config1_config3.json").read_text())
+
+    assert _run(acombine_config_files(in_files, max_concurrency=1)) == expected
+
+
+def test_acombine_config_files_rejects_bad_max_concurrency(datadir: Path):
+    with pytest.raises(ValueError):
+        _run(acombine_config_files([datadir / "config1.json"], max_concurrency=0))
+
+
+def test_acombine_config_files_bounds_concurrency(
+    datadir: Path,
+    mocker: MockerFixture,
+):
+    in_flight = 0
+    max_in_flight = 0
+
+    def slow_load(fp):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        time.sleep(0.01)
+        in_flight -= 1
+        return {"descriptions": [{}]}
+
+    mocker.patch("compile_dcm2bids_config.load_config_file", slow_load)
+    in_files = [datadir / "config1.json"] * 10
+
+    combined = _run(acombine_config_files(in_files, max_concurrency=2))
+
+    assert len(combined["descriptions"]) == 10
+    assert max_in_flight <= 2
+
+
+def test_acombine_config_files_is_cancellable(
+    datadir: Path,
+    mocker: MockerFixture,
+):
+    def slow_load(fp):
+        time.sleep(0.05)
+        return {"descriptions": []}
+
+    mocker.patch("compile_dcm2bids_config.load_config_file", slow_load)
+    in_files = [datadir / "config1.json"] * 20
+
+    async def compile_then_cancel():
+        task = asyncio.ensure_future(acombine_config_files(in_files, 1))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await task
+
+    with pytest.raises(asyncio.CancelledError):
+        _run(compile_then_cancel())
+
+
+@pytest.mark.parametrize("to_yaml", [False, True])
+def test_aserialize_config(datadir: Path, to_yaml: bool):
+    config = load_config_file(datadir / "config1.json")
+    expected = serialize_config(config, to_yaml=to_yaml)
+
+    assert _run(aserialize_config(config, to_yaml=to_yaml)) == expected
@@ -0,0 +1,156 @@
+from pathlib import Path
+
+from compile_dcm2bids_config import combine_config
+from compile_dcm2bids_config import ConfigDiff
+from compile_dcm2bids_config import DescriptionChange
+from compile_dcm2bids_config import diff_configs
+from compile_dcm2bids_config import load_config_file
+
+
+def _description(label: str, **kwargs):
+    return {"dataType": "anat", "modalityLabel": label, **kwargs}
+
+
+def test_identical_configs(datadir: Path):
+    config = load_config_file(datadir / "merged_config1_config2.json")
+
+    assert not diff_configs(config, config)
+    assert diff_configs(config, config) == ConfigDiff()
+
+
+def test_shifted_intended_for_is_not_a_change(datadir: Path):
+    config1 = load_config_file(datadir / "config1.json")
+    config2 = load_config_file(datadir / "config2.json")
+    extra = {"descriptions": [_description("extra")]}
+    old = combine_config([config1, config2])
+    new = combine_config([extra, config1, config2])
+
+    config_diff = diff_configs(old, new)
+
+    assert config_diff.added == [0]
+    assert config_diff.removed == [] and config_diff.changed == []
+
+
+def test_added_removed_and_changed_descriptions():
+    old = {
+        "descriptions": [
+            _description("T1w"),
+            _description("T2w", IntendedFor=0),
+            _description("bold", id="func"),
+            _description("dwi", IntendedFor=["func"]),
+        ],
+    }
+    new = {
+        "descriptions": [
+            _description("dwi", IntendedFor=[2]),  # same target, via index
+            _description("T1w"),
+            _description("bold", id="func", customLabels="task-rest"),
+            _description("FLAIR"),
+        ],
+    }
+
+    config_diff = diff_configs(old, new)
+
+    assert config_diff.added == [3]
+    assert config_diff.removed == [1]
+    assert config_diff.changed == [DescriptionChange(2, 2, ["customLabels"])]
+    assert list(config_diff.format(old, new)) == [
+        "- [1] anat/T2w",
+        "+ [3] anat/FLAIR",
+        "~ [2 -> 2] anat/bold/task-rest (customLabels)",
+    ]
+
+
+def test_intended_for_target_change_is_detected():
+    old = {"descriptions": [_description("a"), _description("b"), _description("c")]}
+    new = {"descriptions": [_description("a"), _description("b"), _description("c")]}
+    old["descriptions"][2]["IntendedFor"] = 0
+    new["descriptions"][2]["IntendedFor"] = 1
+
+    config_diff = diff_configs(old, new)
+
+    assert config_diff.changed == [DescriptionChange(2, 2, ["IntendedFor"])]
+    assert not config_diff.added and not config_diff.removed
+
+
+def test_editing_an_intended_for_target_only_changes_the_target():
+    old = {
+        "descriptions": [
+            _description("T1w", criteria={"SeriesDescription": "*T1*"}),
+            _description("T2w", IntendedFor=0),
+        ],
+    }
+    new = {
+        "descriptions": [
+            _description("T1w", criteria={"SeriesDescription": "*MPRAGE*"}),
+            _description("T2w", IntendedFor=0),
+        ],
+    }
+
+    config_diff = diff_configs(old, new)
+
+    assert config_diff.changed == [DescriptionChange(0, 0, ["criteria"])]
+    assert not config_diff.added and not config_diff.removed
+
+
+def test_duplicate_descriptions_are_matched_one_to_one():
+    old = {"descriptions": [_description("a"), _description("a")]}
+    new = {"descriptions": [_description("a")]}
+
+    assert diff_configs(old, new).removed == [1]
+    assert diff_configs(new, old).added == [1]
+
+
+def test_top_level_params():
+    old = {"a": 1, "b": 2, "descriptions": []}
+    new = {"b": 3, "c": 4, "descriptions": []}
+
+    config_diff = diff_configs(old, new)
+
+    assert config_diff.params_removed == {"a": 1}
+    assert config_diff.params_added == {"c": 4}
+    assert config_diff.params_changed == {"b": (2, 3)}
+    assert config_diff.to_dict()["params_changed"] == {"b": {"old": 2, "new": 3}}
+
+
+def test_duplicate_ids_are_reported_and_matched_in_order():
+    old = {
+        "descriptions": [
+            _description("a", id="x"),
+            _description("b", id="x"),
+        ],
+    }
+    new = {
+        "descriptions": [
+            _description("a", id="x"),
+            _description("b", id="x", customLabels="run-1"),
+        ],
+    }
+
+    config_diff = diff_configs(old, new)
+
+    assert config_diff.old_duplicate_ids == ["x"]
+    assert config_diff.new_duplicate_ids == ["x"]
+    assert config_diff.changed == [DescriptionChange(1, 1, ["customLabels"])]
+    assert not config_diff.added and not config_diff.removed
+    assert list(config_diff.format(old, new))[:2] == [
+        "! duplicate id in old config: 'x'",
+        "! duplicate id in new config: 'x'",
+    ]
+    assert not diff_configs(old, old)
+
+
+def test_retargeting_between_same_label_descriptions_is_detected():
+    def config(intended_for: int):
+        return {
+            "descriptions": [
+                _description("fmap", IntendedFor=intended_for),
+                _description("bold", customLabels="task-rest", criteria={"A": "1"}),
+                _description("bold", customLabels="task-rest", criteria={"A": "2"}),
+            ],
+        }
+
+    config_diff = diff_configs(config(1), config(2))
+
+    assert config_diff.changed == [DescriptionChange(0, 0, ["IntendedFor"])]
+    assert not diff_configs(config(1), config(1))
@@ -1,7 +1,13 @@
+import json
+import socket
 import subprocess
 from pathlib import Path
 
 import pytest
+from compile_dcm2bids_config import load_config_file
+from compile_dcm2bids_config import load_pickle_config
+from compile_dcm2bids_config import SourceLocation
+from compile_dcm2bids_config import SourceMap
 
 
 @pytest.mark.e2e
@@ -59,3 +65,183 @@ def test_cli_yaml_output(datadir: Path):
     assert res.returncode == 0
     assert res.stderr == ""
     assert res.stdout == expected.read_text()
+
+
+@pytest.mark.e2e
+def test_cli_serve(datadir: Path):
+    expected = datadir / "merged_config1_config2.json"
+    request = {"in_files": ["config1.json", "config2.json"], "cwd": str(datadir)}
+
+    with subprocess.Popen(
+        ("compile-dcm2bids-config", "serve", "--port", "0"),
+        stderr=subprocess.PIPE,
+        encoding="utf8",
+    ) as proc:
+        try:
+            assert proc.stderr is not None
+            host, port = proc.stderr.readline().split()[-1].rsplit(":", 1)
+            assert "--root" in proc.stderr.readline()  # warns without --root
+            with socket.create_connection((host, int(port)), timeout=10) as conn:
+                conn.sendall(json.dumps(request).encode("utf8") + b"\n")
+                with conn.makefile("rb") as f:
+                    response = json.loads(f.readline())
+        finally:
+            proc.terminate()
+
+    assert response == {"output": expected.read_text()}
+
+
+@pytest.mark.e2e
+def test_cli_pickle_output(datadir: Path, tmp_path: Path):
+    config1 = datadir / "config1.json"
+    config2 = datadir / "config2.json"
+    expected = datadir / "merged_config1_config2.json"
+    out_file = tmp_path / "combined.pickle"
+
+    res = subprocess.run(
+        ("compile-dcm2bids-config", "-f", "pickle", "-o", out_file, config1, config2),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=True,
+        encoding="utf8",
+    )
+
+    assert res.returncode == 0
+    assert res.stderr == ""
+    assert load_pickle_config(out_file) == load_config_file(expected)
+
+    # pickled outputs can be fed back into later combines (explicitly)
+    refused = subprocess.run(
+        ("compile-dcm2bids-config", out_file),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding="utf8",
+    )
+    assert refused.returncode != 0 and "PickleLoadError" in refused.stderr
+    res = subprocess.run(
+        ("compile-dcm2bids-config", "--allow-pickle", "-f", "json-compact", out_file),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=True,
+        encoding="utf8",
+    )
+
+    assert json.loads(res.stdout) == load_config_file(expected)
+
+
+@pytest.mark.e2e
+def test_cli_match(datadir: Path, tmp_path: Path):
+    (tmp_path / "001_AX_SWI.json").write_text('{"SeriesDescription": "AX_SWI"}')
+    (tmp_path / "002_DWI.json").write_text('{"SeriesDescription": "DWI"}')
+    (tmp_path / "003_echo-3.json").write_text('{"SeriesDescription": "fmap"}')
+    argv = ("compile-dcm2bids-config", "match", datadir / "merged_config1_config2.json")
+
+    res = subprocess.run(
+        (*argv, tmp_path),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=True,
+        encoding="utf8",
+    )
+    (tmp_path / "004_broken.json").write_text("[]")
+    broken = subprocess.run(
+        (*argv, tmp_path),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding="utf8",
+    )
+
+    assert res.returncode == 0
+    assert res.stderr == ""
+    assert res.stdout == (
+        "001_AX_SWI.json: 0 (anat/SWI), 3 (anat/SWI)\n"
+        "002_DWI.json: 2 (dwi/dwi)\n"
+        "003_echo-3.json: 5 (fmap/fmap)\n"
+    )
+    assert broken.returncode == 1
+    assert broken.stderr == ""
+    assert broken.stdout.startswith(res.stdout)
+    assert broken.stdout.splitlines()[-1].startswith(
+        "004_broken.json: error: could not be loaded: ",
+    )
+
+
+@pytest.mark.e2e
+def test_cli_validate(datadir: Path, tmp_path: Path):
+    bad = tmp_path / "bad.json"
+    bad.write_text('{"descriptions": [{"dataType": "anat", "IntendedFor": 3}]}')
+
+    ok = subprocess.run(
+        ("compile-dcm2bids-config", "validate", datadir / "config1.json"),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding="utf8",
+    )
+    res = subprocess.run(
+        ("compile-dcm2bids-config", "validate", datadir / "config1.json", bad),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding="utf8",
+    )
+
+    assert ok.returncode == 0 and ok.stdout == ""
+    assert res.returncode == 1
+    assert res.stdout.splitlines() == [
+        f"{bad}:0: modalityLabel: is required",
+        f"{bad}:0: criteria: is required",
+        f"{bad}:0: IntendedFor: index [3] is out of range for 1 descriptions",
+    ]
+
+
+@pytest.mark.e2e
+def test_cli_source_map(datadir: Path, tmp_path: Path):
+    config1 = datadir / "config1.json"
+    config2 = datadir / "config2.json"
+    source_map_file = tmp_path / "combined.map.json"
+
+    res = subprocess.run(
+        (
+            "compile-dcm2bids-config",
+            "--source-map",
+            source_map_file,
+            config1,
+            config2,
+        ),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=True,
+        encoding="utf8",
+    )
+
+    assert res.returncode == 0
+    source_map = SourceMap.load(source_map_file)
+    assert len(source_map) == len(json.loads(res.stdout)["descriptions"])
+    assert source_map.lookup(5) == SourceLocation(str(config2), 3, 2)
+
+
+@pytest.mark.e2e
+def test_cli_diff(datadir: Path):
+    merged = datadir / "merged_config1_config2.json"
+    config1 = datadir / "config1.json"
+
+    same = subprocess.run(
+        ("compile-dcm2bids-config", "diff", merged, merged),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding="utf8",
+    )
+    res = subprocess.run(
+        ("compile-dcm2bids-config", "diff", config1, merged),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding="utf8",
+    )
+
+    assert same.returncode == 0 and same.stdout == ""
+    assert res.returncode == 1
+    assert res.stdout.splitlines() == [
+        "+ [2] dwi/dwi",
+        "+ [3] anat/SWI",
+        "+ [4] func/bold/task-rest",
+        "+ [5] fmap/fmap",
+    ]
@@ -0,0 +1,186 @@
+import fnmatch
+import json
+import random
+import time
+from pathlib import Path
+
+import pytest
+from compile_dcm2bids_config import _create_match_parser
+from compile_dcm2bids_config import CriteriaIndex
+from compile_dcm2bids_config import load_config_file
+from compile_dcm2bids_config import match_sidecars
+
+
+@pytest.mark.parametrize(
+    ("criteria", "sidecar", "expected"),
+    [
+        ({"SeriesDescription": "*SWI*"}, {"SeriesDescription": "AX_SWI_3D"}, True),
+        ({"SeriesDescription": "*SWI*"}, {"SeriesDescription": "AX_DWI"}, False),
+        ({"SeriesDescription": "*SWI*"}, {}, False),
+        ({"SeriesDescription": "*"}, {}, True),  # missing keys match as ""
+        ({"EchoNumber": 2}, {"EchoNumber": 2}, True),
+        ({"EchoNumber": "[12]"}, {"EchoNumber": 1}, True),
+        ({"ImageType": ["ORIG*", "M"]}, {"ImageType": ["ORIGINAL", "M"]}, True),
+        ({"ImageType": ["ORIG*", "M"]}, {"ImageType": ["ORIGINAL", "P"]}, False),
+        ({"ImageType": ["ORIG*"]}, {"ImageType": ["ORIGINAL", "M"]}, False),
+        ({"ImageType": ["ORIG*"]}, {"ImageType": "ORIGINAL"}, False),
+        ({"ImageType": "ORIG*"}, {"ImageType": ["ORIGINAL"]}, False),
+        ({"A": "a*", "B": "b*"}, {"A": "ab", "B": "ba"}, True),
+        ({"A": "a*", "B": "b*"}, {"A": "ab", "B": "ab"}, False),
+        ({}, {"A": "a"}, True),
+    ],
+)
+def test_criteria_index_match(criteria, sidecar, expected):
+    index = CriteriaIndex([{"criteria": criteria}])
+
+    assert index.match(sidecar) == ([0] if expected else [])
+
+
+def test_criteria_index_shares_patterns_between_descriptions():
+    descriptions = [
+        {"criteria": {"SeriesDescription": "*SWI*"}},
+        {"criteria": {"SeriesDescription": "*DWI*"}},
+        {"criteria": {"SeriesDescription": "*SWI*", "EchoNumber": 1}},
+        {"criteria": {"SeriesDescription": "*SWI*"}},
+    ]
+    index = CriteriaIndex(descriptions)
+
+    assert index.match({"SeriesDescription": "SWI", "EchoNumber": 1}) == [0, 2, 3]
+    assert index.match({"SeriesDescription": "SWI", "EchoNumber": 2}) == [0, 3]
+    assert len(index._index["SeriesDescription"]) == 2
+
+
+@pytest.mark.parametrize(
+    ("params", "criteria", "sidecar", "expected"),
+    [
+        ({"searchMethod": "re"}, {"A": "SWI"}, {"A": "AX_SWI_3D"}, True),
+        ({"searchMethod": "re"}, {"A": "^SWI"}, {"A": "AX_SWI_3D"}, False),
+        ({"searchMethod": "re"}, {"A": "^(a)\\1$"}, {"A": "aa"}, True),
+        ({"searchMethod": "re"}, {"A": "[12]"}, {"A": 12}, True),
+        ({"searchMethod": "re"}, {"A": "*SWI*"}, {"A": "*SWI*"}, None),
+        ({"caseSensitive": False}, {"A": "*swi*"}, {"A": "AX_SWI"}, True),
+        ({"caseSensitive": False}, {"A": "ax_swi"}, {"A": "AX_SWI"}, True),
+        ({"caseSensitive": False}, {"A": "a*"}, {"A": "AX_SWI"}, True),
+        ({}, {"A": "*swi*"}, {"A": "AX_SWI"}, False),
+        (
+            {"searchMethod": "re", "caseSensitive": False},
+            {"A": "swi"},
+            {"A": "SWI"},
+            True,
+        ),
+        ({"searchMethod": "nope"}, {"A": "*"}, {"A": "a"}, None),
+    ],
+)
+def test_criteria_index_honours_search_params(params, criteria, sidecar, expected):
+    config = {**params, "descriptions": [{"criteria": criteria}]}
+    if expected is None:
+        with pytest.raises(Exception):
+            CriteriaIndex.from_config(config)
+        return
+
+    assert CriteriaIndex.from_config(config).match(sidecar) == ([0] if expected else [])
+
+
+@pytest.mark.parametrize("case_sensitive", [True, False])
+def test_criteria_index_agrees_with_fnmatch(case_sensitive: bool):
+    rng = random.Random(0)
+    alphabet = "abAB?*[]!-"
+    patterns = ["".join(rng.choices(alphabet, k=rng.randint(0, 5))) for _ in range(500)]
+    values = ["".join(rng.choices("abAB-[]", k=rng.randint(0, 4))) for _ in range(500)]
+    index = CriteriaIndex(
+        [{"criteria": {"A": p}} for p in patterns],
+        case_sensitive=case_sensitive,
+    )
+
+    for value in values:
+        expected = [
+            i
+            for i, p in enumerate(patterns)
+            if case_sensitive
+            and fnmatch.fnmatchcase(value, p)
+            or not case_sensitive
+            and fnmatch.fnmatchcase(value.lower(), p.lower())
+        ]
+        assert index.match({"A": value}) == expected, value
+
+
+def test_criteria_index_does_not_backtrack_catastrophically():
+    # two patterns, so they're also joined into the prefilter alternation
+    patterns = ["*a*a*a*a*a*a*a*b", "*a*a*a*a*a*a*a*c"]
+    index = CriteriaIndex([{"criteria": {"A": p}} for p in patterns])
+
+    start = time.perf_counter()
+    assert index.match({"A": "a" * 80}) == []
+    assert time.perf_counter() - start < 1
+    assert index._index["A"]._prefilter is not None
+
+
+def test_criteria_index_skips_non_candidate_patterns():
+    descriptions = [
+        {"criteria": {"SeriesDescription": "rs_fMRI"}},
+        {"criteria": {"SeriesDescription": "T1*"}},
+        {"criteria": {"SeriesDescription": "*SWI*"}},
+        {"criteria": {"SeriesDescription": "*DWI*"}},
+    ]
+    key_index = CriteriaIndex(descriptions)._index["SeriesDescription"]
+
+    assert key_index._literal == {"rs_fMRI": [0]}
+    assert list(key_index._by_first) == ["T"]
+    assert key_index._prefilter is not None
+    assert key_index._prefilter("localizer") is None
+    assert list(key_index.matches("AX_SWI")) == [[2]]
+
+
+@pytest.fixture
+def sidecar_dir(tmp_path: Path) -> Path:
+    sidecars = {
+        "sub-01/001_AX_SWI.json": {"SeriesDescription": "AX_SWI"},
+        "sub-01/002_fmap_echo-4.json": {"SeriesDescription": "fmap"},
+        "sub-01/003_localizer.json": {"SeriesDescription": "localizer"},
+    }
+    for name, sidecar in sidecars.items():
+        fp = tmp_path / name
+        fp.parent.mkdir(parents=True, exist_ok=True)
+        fp.write_text(json.dumps(sidecar))
+    return tmp_path
+
+
+@pytest.mark.parametrize("jobs", [1, 4])
+def test_match_sidecars(datadir: Path, sidecar_dir: Path, jobs: int):
+    config = load_config_file(datadir / "config1.json")
+    sidecars = sorted(sidecar_dir.rglob("*.json"))
+
+    matches = match_sidecars(config, sidecars, jobs=jobs)
+
+    assert [(m.path.name, m.indices, m.error) for m in matches] == [
+        ("001_AX_SWI.json", [0], None),
+        ("002_fmap_echo-4.json", [1], None),  # matched by SidecarFilename
+        ("003_localizer.json", [], None),
+    ]
+
+
+def test_match_sidecars_reports_bad_sidecars(datadir: Path, sidecar_dir: Path):
+    (sidecar_dir / "bad.json").write_text('{"SeriesDescription": ')
+    (sidecar_dir / "list.json").write_text("[1, 2]")
+    (sidecar_dir / "dir.json").mkdir()
+    config = load_config_file(datadir / "config1.json")
+    sidecars = sorted(sidecar_dir.rglob("*.json"))
+
+    matches = match_sidecars(config, sidecars)
+
+    errors = {m.path.name: m.error for m in matches if m.error is not None}
+    assert sorted(errors) == ["bad.json", "dir.json", "list.json"]
+    assert all(e.startswith("could not be loaded: ") for e in errors.values())
+    assert [m.indices for m in matches if m.path.name == "001_AX_SWI.json"] == [[0]]
+
+
+def test_create_match_parser():
+    parser = _create_match_parser()
+    args = parser.parse_args(["config.json", "sidecars", "-j", "2", "--json"])
+
+    assert args.config == Path("config.json")
+    assert args.sidecar_dir == Path("sidecars")
+    assert args.jobs == 2 and args.json
+
+    with pytest.raises(SystemExit):
+        parser.parse_args(["config.json", "sidecars", "-j", "0"])
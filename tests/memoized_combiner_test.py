@@ -0,0 +1,85 @@
+import pytest
+from compile_dcm2bids_config import combine_config
+from compile_dcm2bids_config import DescriptionIdError
+from compile_dcm2bids_config import MemoizedCombiner
+from compile_dcm2bids_config import TopLevelParameterError
+
+CONFIG_A = {
+    "a": 1,
+    "descriptions": [{"id": "x"}, {"IntendedFor": [0, "x"]}, {"IntendedFor": 1}],
+}
+CONFIG_B = {"b": 2, "descriptions": [{}, {"IntendedFor": 0}]}
+CONFIG_C = {"descriptions": [{"IntendedFor": [1]}]}
+
+
+@pytest.mark.parametrize(
+    "configs",
+    [
+        [CONFIG_A],
+        [CONFIG_A, CONFIG_B],
+        [CONFIG_B, CONFIG_A, CONFIG_C],
+        [CONFIG_B, {}, CONFIG_C, CONFIG_B],
+    ],
+)
+def test_matches_combine_config(configs):
+    combiner = MemoizedCombiner()
+
+    assert combiner(configs) == combine_config(configs)
+    assert combiner(configs) == combine_config(configs)
+
+
+def test_segments_are_reused_per_offset():
+    combiner = MemoizedCombiner()
+    combiner([CONFIG_B, CONFIG_C])
+    combiner([CONFIG_B, CONFIG_C])  # both segments cached
+    combiner([CONFIG_A, CONFIG_C])  # CONFIG_C is now at a different offset
+
+    stats = combiner.stats()
+    assert stats["segments"].hits == 2
+    assert stats["segments"].misses == 4
+    assert stats["params"].hits == 1
+
+
+def test_equal_configs_share_cache_entries():
+    combiner = MemoizedCombiner()
+    combiner([{"descriptions": [{"IntendedFor": 0}]}])
+    combiner([{"descriptions": [{"IntendedFor": 0}]}])
+
+    assert combiner.stats()["segments"].hits == 1
+
+
+def test_returned_objects_are_safe_to_mutate():
+    combiner = MemoizedCombiner()
+    first = combiner([CONFIG_A, CONFIG_B])
+    first["a"] = 100
+    first["descriptions"][1]["IntendedFor"].append(42)
+
+    assert combiner([CONFIG_A, CONFIG_B]) == combine_config([CONFIG_A, CONFIG_B])
+    assert CONFIG_A["descriptions"][1]["IntendedFor"] == [0, "x"]
+
+
+def test_cache_is_bounded():
+    combiner = MemoizedCombiner(max_entries=2)
+    for i in range(5):
+        combiner([{"descriptions": [{"IntendedFor": i}]}])
+
+    stats = combiner.stats()
+    assert stats["segments"].entries == 2 and stats["segments"].evictions == 3
+
+    combiner.clear()
+    assert combiner.stats()["params"].entries == 0
+
+
+@pytest.mark.parametrize(
+    ("configs", "error"),
+    [
+        ([CONFIG_A, CONFIG_A], DescriptionIdError),
+        ([{"a": 1}, {"a": 2}], TopLevelParameterError),
+        ([{"descriptions": [{"IntendedFor": 0.5}]}], ValueError),
+    ],
+)
+def test_errors(configs, error):
+    combiner = MemoizedCombiner()
+    for _ in range(2):  # errors are raised even once segments are cached
+        with pytest.raises(error):
+            combiner(configs)
@@ -0,0 +1,91 @@
+import json
+from pathlib import Path
+
+import pytest
+from compile_dcm2bids_config import _create_parser
+from compile_dcm2bids_config import CompileService
+from compile_dcm2bids_config import load_config_file
+from compile_dcm2bids_config import load_pickle_config
+from compile_dcm2bids_config import PickleLoadError
+from compile_dcm2bids_config import serialize_config
+from compile_dcm2bids_config import serialize_config_bytes
+
+
+@pytest.fixture
+def merged_config(datadir: Path):
+    return load_config_file(datadir / "merged_config1_config2.json")
+
+
+def test_json_compact(merged_config):
+    output = serialize_config(merged_config, output_format="json-compact")
+
+    assert isinstance(output, str)
+    assert output.count("\n") == 1 and output.endswith("\n")
+    assert json.loads(output) == merged_config
+
+
+@pytest.mark.parametrize("suffix", [".pickle", ".pkl"])
+def test_pickle_roundtrip(merged_config, tmp_path: Path, suffix: str):
+    output = serialize_config_bytes(merged_config, "pickle")
+    assert isinstance(output, bytes)
+
+    fp = tmp_path / f"combined{suffix}"
+    fp.write_bytes(output)
+    assert load_pickle_config(fp) == merged_config
+    # pickles are only loaded when explicitly asked for
+    with pytest.raises(PickleLoadError):
+        load_config_file(fp)
+
+
+def test_to_yaml(merged_config):
+    expected = serialize_config(merged_config, output_format="yaml")
+
+    assert serialize_config(merged_config, to_yaml=True) == expected
+    assert serialize_config(merged_config, True, "yaml") == expected
+    with pytest.raises(ValueError):
+        serialize_config(merged_config, True, "json-compact")
+
+
+@pytest.mark.parametrize(
+    ("argv", "expected"),
+    [
+        (["a.json"], "json"),
+        (["--to-yaml", "a.json"], "yaml"),
+        (["-f", "pickle", "--to-yaml", "a.json"], "yaml"),
+        (["--to-yaml", "-f", "json-compact", "a.json"], "json-compact"),
+    ],
+)
+def test_to_yaml_flag_is_an_alias(argv, expected):
+    assert _create_parser().parse_args(argv).output_format == expected
+
+
+@pytest.mark.parametrize(
+    ("serialize", "output_format"),
+    [
+        (serialize_config, "xml"),
+        (serialize_config, "pickle"),
+        (serialize_config_bytes, "json"),
+    ],
+)
+def test_unknown_format_raises(merged_config, serialize, output_format):
+    with pytest.raises(ValueError):
+        serialize(merged_config, output_format=output_format)
+
+
+def test_compile_service_formats(datadir: Path):
+    service = CompileService()
+    in_files = [datadir / "config1.json", datadir / "config2.json"]
+    compact = service.compile(in_files, output_format="json-compact")
+
+    assert json.loads(compact) == json.loads(service.compile(in_files))
+    assert compact != service.compile(in_files)
+    with pytest.raises(ValueError):
+        service.compile(in_files, output_format="pickle")
+
+
+def test_compile_service_rejects_pickle_inputs(merged_config, tmp_path: Path):
+    fp = tmp_path / "combined.pkl"
+    fp.write_bytes(serialize_config_bytes(merged_config))
+
+    with pytest.raises(PickleLoadError):
+        CompileService().compile([fp])
@@ -0,0 +1,215 @@
+"""Scale and memory regression tests for the combine engine.
+
+These are slow, so they're excluded from the default test run. Run them with:
+
+    pytest -m scale
+"""
+
+import json
+import random
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+
+import pytest
+from compile_dcm2bids_config import combine_config
+from compile_dcm2bids_config import diff_configs
+from compile_dcm2bids_config import main
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+# allowed slowdown relative to perfectly linear scaling (timings are noisy)
+LINEAR_SLACK = 3.0
+# allowed peak memory while combining, relative to the size of the inputs
+MEMORY_BUDGET = 2.0
+CLI_MEMORY_BUDGET = 5.0
+
+
+def generate_configs(n_descriptions: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """Generate random configs with `n_descriptions` descriptions in total.
+
+    Every description gets a unique `customLabels` which is used as a marker to
+    identify it in the combined config.
+    """
+    n_files = rng.randint(1, min(100, n_descriptions))
+    sizes = [n_descriptions // n_files] * n_files
+    sizes[-1] += n_descriptions % n_files
+    configs: List[Dict[str, Any]] = []
+    for f, size in enumerate(sizes):
+        descriptions = []
+        for i in range(size):
+            description: Dict[str, Any] = {
+                "dataType": "anat",
+                "modalityLabel": "T1w",
+                "customLabels": f"file-{f}-desc-{i}",
+                "criteria": {"SeriesDescription": f"*{i}*"},
+            }
+            r = rng.random()
+            if r < 0.2:
+                description["IntendedFor"] = rng.randrange(size)
+            elif r < 0.4:
+                k = rng.randint(1, 3)
+                description["IntendedFor"] = [rng.randrange(size) for _ in range(k)]
+            elif r < 0.45:
+                description["IntendedFor"] = [rng.randrange(size), f"id-{f}-0"]
+            elif r < 0.5:
+                description["IntendedFor"] = f"id-{f}-0"
+            if i == 0:
+                description["id"] = f"id-{f}-0"
+            descriptions.append(description)
+        configs.append({"descriptions": descriptions})
+    return configs
+
+
+def _targets(intended_for: Any) -> List[Any]:
+    if intended_for is None:
+        return []
+    return intended_for if isinstance(intended_for, list) else [intended_for]
+
+
+def assert_intended_for_preserved(
+    configs: List[Dict[str, Any]],
+    combined: Dict[str, Any],
+):
+    descriptions = combined["descriptions"]
+    assert len(descriptions) == sum(len(c["descriptions"]) for c in configs)
+    g = 0
+    for config in configs:
+        local = config["descriptions"]
+        for original in local:
+            rebased = descriptions[g]
+            assert rebased["customLabels"] == original["customLabels"]
+            before = _targets(original.get("IntendedFor"))
+            after = _targets(rebased.get("IntendedFor"))
+            assert len(before) == len(after)
+            for b, a in zip(before, after):
+                if isinstance(b, str):
+                    assert a == b
+                else:
+                    # still points at the same description
+                    assert descriptions[a]["customLabels"] == local[b]["customLabels"]
+            g += 1
+
+
+def _best_time(func: Callable[[], Any], repeat: int = 3) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def _traced_size(func: Callable[[], Any]):
+    """Call `func` returning (its result, memory held by the result)."""
+    tracemalloc.start()
+    try:
+        result = func()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, size
+
+
+def _traced_peak(func: Callable[[], Any]) -> int:
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def _write_configs(configs: List[Dict[str, Any]], directory: Path) -> List[str]:
+    paths = []
+    for i, config in enumerate(configs):
+        fp = directory / f"config{i}.json"
+        fp.write_text(json.dumps(config))
+        paths.append(str(fp))
+    return paths
+
+
+@pytest.mark.scale
+@pytest.mark.parametrize("n", SIZES)
+def test_rebased_intended_for_points_to_same_descriptions(n: int):
+    # more (random) examples for the smaller sizes
+    for example in range(max(1, 10_000 // n)):
+        configs = generate_configs(n, random.Random(f"{n}-{example}"))
+        assert_intended_for_preserved(configs, combine_config(configs))
+
+
+@pytest.mark.scale
+def test_combine_config_time_is_linear():
+    small, large = 10_000, 100_000
+    small_configs = generate_configs(small, random.Random(0))
+    large_configs = generate_configs(large, random.Random(0))
+
+    t_small = _best_time(lambda: combine_config(small_configs))
+    t_large = _best_time(lambda: combine_config(large_configs))
+
+    assert t_large / t_small < (large / small) * LINEAR_SLACK
+
+
+@pytest.mark.scale
+@pytest.mark.parametrize("n", SIZES)
+def test_combine_config_peak_memory(n: int):
+    configs, input_size = _traced_size(
+        lambda: generate_configs(n, random.Random(n)),
+    )
+
+    peak = _traced_peak(lambda: combine_config(configs))
+
+    assert peak < input_size * MEMORY_BUDGET
+
+
+@pytest.mark.scale
+def test_cli_time_is_linear(tmp_path: Path):
+    small, large = 10_000, 100_000
+    timings = []
+    for n in (small, large):
+        directory = tmp_path / str(n)
+        directory.mkdir()
+        in_files = _write_configs(generate_configs(n, random.Random(n)), directory)
+        argv = [*in_files, "-o", str(directory / "combined.json")]
+        timings.append(_best_time(lambda: main(argv)))
+
+    t_small, t_large = timings
+    assert t_large / t_small < (large / small) * LINEAR_SLACK
+
+
+@pytest.mark.scale
+@pytest.mark.parametrize("n", SIZES[:-1])
+def test_cli_peak_memory(tmp_path: Path, n: int):
+    configs, input_size = _traced_size(
+        lambda: generate_configs(n, random.Random(n)),
+    )
+    in_files = _write_configs(configs, tmp_path)
+    del configs
+    out_file = tmp_path / "combined.json"
+
+    peak = _traced_peak(lambda: main([*in_files, "-o", str(out_file)]))
+
+    assert peak < input_size * CLI_MEMORY_BUDGET
+    assert len(json.loads(out_file.read_text())["descriptions"]) == n
+
+
+@pytest.mark.scale
+def test_diff_configs_time_is_linear():
+    timings = []
+    for n in (10_000, 100_000):
+        configs = generate_configs(n, random.Random(n))
+        old = combine_config(configs)
+        # prepend a description, shifting every IntendedFor index
+        extra = {"descriptions": [{"dataType": "anat", "modalityLabel": "T2w"}]}
+        new = combine_config([extra, *configs])
+        config_diff = diff_configs(old, new)
+        assert config_diff.added == [0]
+        assert not config_diff.removed and not config_diff.changed
+        timings.append(_best_time(lambda: diff_configs(old, new)))
+
+    t_small, t_large = timings
+    assert t_large / t_small < 10 * LINEAR_SLACK
@@ -0,0 +1,284 @@
+import asyncio
+import json
+import os
+import stat
+import sys
+from pathlib import Path
+
+import pytest
+from compile_dcm2bids_config import _create_serve_parser
+from compile_dcm2bids_config import CompileService
+from compile_dcm2bids_config import InputOutsideRootError
+from compile_dcm2bids_config import LRUCache
+from compile_dcm2bids_config import start_compile_server
+from pytest_mock import MockerFixture
+
+
+def _run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+class TestLRUCache:
+    def test_evicts_least_recently_used_entry(self):
+        cache = LRUCache(max_entries=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        assert cache.get("a") == 1  # "b" is now least recently used
+        cache.put("c", 3)
+
+        assert "b" not in cache
+        assert cache.get("a") == 1 and cache.get("c") == 3
+        assert cache.stats().evictions == 1
+
+    def test_evicts_by_size(self):
+        cache = LRUCache(max_bytes=10, sizeof=len)
+        cache.put("a", "x" * 4)
+        cache.put("b", "x" * 4)
+        cache.put("c", "x" * 4)
+
+        assert len(cache) == 2 and "a" not in cache
+        assert cache.stats().bytes == 8
+
+    def test_does_not_cache_values_larger_than_max_bytes(self):
+        cache = LRUCache(max_bytes=10, sizeof=len)
+        cache.put("a", "x" * 4)
+        cache.put("b", "x" * 11)
+
+        assert "a" in cache and "b" not in cache
+
+    def test_stats(self):
+        cache = LRUCache()
+        cache.put("a", 1)
+        cache.get("a")
+        cache.get("b")
+
+        stats = cache.stats()
+        assert (stats.hits, stats.misses, stats.entries) == (1, 1, 1)
+
+    def test_discard(self):
+        cache = LRUCache(max_bytes=10, sizeof=len)
+        cache.put("a", "x" * 4)
+        cache.discard("a")
+        cache.discard("b")
+
+        assert "a" not in cache and cache.stats().bytes == 0
+
+    def test_max_bytes_requires_sizeof(self):
+        with pytest.raises(ValueError):
+            LRUCache(max_bytes=10)
+
+
+class TestCompileService:
+    def test_compile(self, datadir: Path):
+        service = CompileService()
+        in_files = [datadir / "config1.json", datadir / "config2.json"]
+        expected = (datadir / "merged_config1_config2.json").read_text()
+
+        assert service.compile(in_files) == expected
+        assert service.compile(in_files) == expected
+        assert service.results.stats().hits == 1
+
+    def test_inputs_are_invalidated_by_mtime(self, tmp_path: Path):
+        config = tmp_path / "config.json"
+        config.write_text(json.dumps({"descriptions": [{}]}))
+        service = CompileService()
+        first = json.loads(service.compile([config]))
+
+        config.write_text(json.dumps({"descriptions": [{}, {}]}))
+        st = config.stat()
+        os.utime(config, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+        second = json.loads(service.compile([config]))
+
+        assert len(first["descriptions"]) == 1
+        assert len(second["descriptions"]) == 2
+
+    def test_parsed_inputs_are_bounded(self, tmp_path: Path):
+        service = CompileService(max_inputs=2)
+        for i in range(4):
+            config = tmp_path / f"config{i}.json"
+            config.write_text(json.dumps({"descriptions": [{}]}))
+            service.compile([config])
+
+        assert len(service.inputs) == 2
+
+    def test_deleted_inputs_are_dropped(self, tmp_path: Path):
+        config = tmp_path / "config.json"
+        config.write_text(json.dumps({"descriptions": [{}]}))
+        service = CompileService()
+        service.compile([config])
+        config.unlink()
+
+        with pytest.raises(FileNotFoundError):
+            service.compile([config])
+        assert len(service.inputs) == 0
+
+    def test_inputs_must_be_under_roots(self, tmp_path: Path):
+        root = tmp_path / "configs"
+        root.mkdir()
+        config = root / "config.json"
+        config.write_text('{"descriptions": []}')
+        secret = tmp_path / "secret.json"
+        secret.write_text('{"token": "s3cret", "descriptions": []}')
+        (root / "escape.json").symlink_to(secret)
+        service = CompileService(roots=[root])
+
+        assert json.loads(service.compile([config])) == {"descriptions": []}
+        with pytest.raises(InputOutsideRootError):
+            service.compile([secret])
+        with pytest.raises(InputOutsideRootError):
+            service.compile([root / "escape.json"])  # resolved before checking
+        with pytest.raises(InputOutsideRootError):
+            service.compile([root / ".." / "secret.json"])
+
+
+class TestCompileServer:
+    @staticmethod
+    async def _request(reader, writer, request):
+        writer.write(json.dumps(request).encode("utf8") + b"\n")
+        await writer.drain()
+        return json.loads(await reader.readline())
+
+    @staticmethod
+    async def _hang_up(reader, writer):
+        # let the server see EOF and close the connection from its end
+        writer.write_eof()
+        await reader.read()
+        writer.close()
+
+    def test_tcp_roundtrip(self, datadir: Path):
+        expected = (datadir / "merged_config1_config2.json").read_text()
+
+        async def roundtrip():
+            server = await start_compile_server(CompileService(), port=0)
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            try:
+                ok = await self._request(
+                    reader,
+                    writer,
+                    {"in_files": ["config1.json", "config2.json"], "cwd": str(datadir)},
+                )
+                bad = await self._request(reader, writer, {"in_files": "nope"})
+                missing = await self._request(
+                    reader,
+                    writer,
+                    {"in_files": [str(datadir / "does-not-exist.json")]},
+                )
+            finally:
+                await self._hang_up(reader, writer)
+                server.close()
+                await server.wait_closed()
+            return ok, bad, missing
+
+        ok, bad, missing = _run(roundtrip())
+
+        assert ok == {"output": expected}
+        assert bad["type"] == "ValueError"
+        assert missing["type"] == "FileNotFoundError"
+
+    def test_errors_keep_the_connection_open(self, tmp_path: Path):
+        bad_yaml = tmp_path / "bad.yaml"
+        bad_yaml.write_text("descriptions: [\n")
+        not_a_dict = tmp_path / "list.json"
+        not_a_dict.write_text("[1, 2]")
+        good = tmp_path / "good.json"
+        good.write_text('{"descriptions": []}')
+
+        async def roundtrip():
+            server = await start_compile_server(CompileService(), port=0)
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            try:
+                responses = []
+                for fp in (bad_yaml, not_a_dict, good):
+                    request = {"in_files": [str(fp)]}
+                    responses.append(await self._request(reader, writer, request))
+            finally:
+                await self._hang_up(reader, writer)
+                server.close()
+                await server.wait_closed()
+            return responses
+
+        yaml_error, attribute_error, ok = _run(roundtrip())
+
+        assert "error" in yaml_error and "error" in attribute_error
+        assert json.loads(ok["output"]) == {"descriptions": []}
+
+    def test_oversized_request(self, mocker: MockerFixture):
+        mocker.patch("compile_dcm2bids_config._MAX_REQUEST_BYTES", 64)
+
+        async def roundtrip():
+            server = await start_compile_server(CompileService(), port=0)
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            try:
+                request = {"in_files": ["x" * 128]}
+                return await self._request(reader, writer, request)
+            finally:
+                await self._hang_up(reader, writer)
+                server.close()
+                await server.wait_closed()
+
+        assert _run(roundtrip())["type"] == "LimitOverrunError"
+
+    def test_refuses_non_loopback_hosts(self):
+        with pytest.raises(ValueError):
+            _run(start_compile_server(CompileService(), host="0.0.0.0", port=0))
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="requires Unix sockets")
+    def test_unix_socket_roundtrip(self, datadir: Path, tmp_path: Path):
+        socket_path = tmp_path / "compile.sock"
+        expected = (datadir / "merged_config1_config3.yaml").read_text()
+
+        async def roundtrip():
+            server = await start_compile_server(CompileService(), path=socket_path)
+            reader, writer = await asyncio.open_unix_connection(str(socket_path))
+            try:
+                in_files = [
+                    str(datadir / "config1.json"),
+                    str(datadir / "config3.yaml"),
+                ]
+                request = {"in_files": in_files, "to_yaml": True}
+                return await self._request(reader, writer, request)
+            finally:
+                await self._hang_up(reader, writer)
+                server.close()
+                await server.wait_closed()
+
+        assert _run(roundtrip()) == {"output": expected}
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="requires Unix sockets")
+    def test_unix_socket_is_private(self, tmp_path: Path):
+        socket_path = tmp_path / "compile.sock"
+
+        async def start_twice():
+            modes = []
+            for _ in range(2):  # the second time replaces the stale socket
+                server = await start_compile_server(CompileService(), path=socket_path)
+                modes.append(stat.S_IMODE(socket_path.stat().st_mode))
+                server.close()
+                await server.wait_closed()
+            return modes
+
+        assert _run(start_twice()) == [0o600, 0o600]
+
+
+def test_create_serve_parser():
+    parser = _create_serve_parser()
+    args = parser.parse_args(["--port", "8000", "--cache-entries", "4"])
+
+    assert args.port == 8000 and args.socket is None
+    assert args.cache_entries == 4
+
+    with pytest.raises(SystemExit):
+        parser.parse_args([])
+    with pytest.raises(SystemExit):
+        parser.parse_args(["--port", "8000", "--host", "0.0.0.0"])
+    assert parser.parse_args(["--port", "1", "--host", "::1"]).host == "::1"
+    assert args.roots is None
+    args = parser.parse_args(["--port", "1", "--root", "a", "--root", "b"])
+    assert args.roots == [Path("a"), Path("b")]
@@ -0,0 +1,58 @@
+from pathlib import Path
+
+import pytest
+from compile_dcm2bids_config import combine_config
+from compile_dcm2bids_config import ConfigCollection
+from compile_dcm2bids_config import SourceLocation
+from compile_dcm2bids_config import SourceMap
+
+CONFIGS = [
+    {"descriptions": [{"n": "a0"}, {"n": "a1", "IntendedFor": 0}]},
+    {"a": 1},  # config w/out descriptions key
+    {"descriptions": []},
+    {"descriptions": [{"n": "b0"}, {"n": "b1"}, {"n": "b2", "IntendedFor": [1]}]},
+]
+SOURCES = ["a.json", "none.json", "empty.json", "b.yaml"]
+
+
+def test_lookup():
+    source_map = ConfigCollection(CONFIGS).source_map(SOURCES)
+
+    assert len(source_map) == 5
+    assert source_map.lookup(1) == SourceLocation("a.json", 1, 0)
+    assert source_map.lookup(4) == SourceLocation("b.yaml", 2, 2)
+
+
+def test_lookup_points_back_to_original_description():
+    combined = combine_config(CONFIGS)
+    source_map = ConfigCollection(CONFIGS).source_map(SOURCES)
+
+    for i, description in enumerate(combined["descriptions"]):
+        location = source_map.lookup(i)
+        config = CONFIGS[SOURCES.index(location.source)]
+        assert config["descriptions"][location.index]["n"] == description["n"]
+        assert i == location.index + location.offset
+
+
+def test_default_sources():
+    source_map = ConfigCollection(CONFIGS).source_map()
+
+    assert source_map.lookup(2).source == "config[3]"
+
+
+@pytest.mark.parametrize("index", [-1, 5])
+def test_lookup_out_of_range(index):
+    source_map = ConfigCollection(CONFIGS).source_map(SOURCES)
+
+    with pytest.raises(IndexError):
+        source_map.lookup(index)
+
+
+def test_dump_and_load(tmp_path: Path):
+    fp = tmp_path / "combined.map.json"
+    source_map = ConfigCollection(CONFIGS).source_map(SOURCES)
+    source_map.dump(fp)
+
+    assert SourceMap.load(fp) == source_map
+    assert fp.read_text().count("\n") == 1
+    assert SourceMap.load(fp).to_dict()["source"] == [0, 0, 3, 3, 3]
@@ -0,0 +1,191 @@
+import time
+from pathlib import Path
+from typing import List
+
+import pytest
+from compile_dcm2bids_config import combine_config
+from compile_dcm2bids_config import ConfigValidationError
+from compile_dcm2bids_config import load_config_file
+from compile_dcm2bids_config import validate_config
+from compile_dcm2bids_config import validate_config_files
+from compile_dcm2bids_config import validate_configs
+from pytest_mock import MockerFixture
+
+
+def _description(**kwargs):
+    description = {
+        "dataType": "anat",
+        "modalityLabel": "T1w",
+        "criteria": {"SeriesDescription": "*T1*"},
+    }
+    description.update(kwargs)
+    return {k: v for k, v in description.items() if v is not None}
+
+
+@pytest.mark.parametrize(
+    "config_file",
+    ["config1.json", "config2.json", "config3.yaml", "merged_config1_config2.json"],
+)
+def test_valid_configs(datadir: Path, config_file: str):
+    assert validate_config(load_config_file(datadir / config_file)) == []
+
+
+@pytest.mark.parametrize(
+    ("description", "field"),
+    [
+        ("not-a-description", "description"),
+        (_description(dataType=None), "dataType"),
+        (_description(dataType=""), "dataType"),
+        (_description(modalityLabel=1), "modalityLabel"),
+        (_description(customLabels=["a"]), "customLabels"),
+        (_description(criteria=None), "criteria"),
+        (_description(criteria={}), "criteria"),
+        (_description(criteria={"ImageType": [{"a": 1}]}), "criteria"),
+        (_description(sidecarChanges="x"), "sidecarChanges"),
+        (_description(IntendedFor=1.5), "IntendedFor"),
+        (_description(IntendedFor=[0, None]), "IntendedFor"),
+        (_description(IntendedFor=True), "IntendedFor"),
+        (_description(IntendedFor=1), "IntendedFor"),  # out of range
+        (_description(IntendedFor=[-1]), "IntendedFor"),  # out of range
+        (_description(id=3), "id"),
+    ],
+)
+def test_invalid_description(description, field):
+    issues = validate_config({"descriptions": [description]}, source="a.json")
+
+    assert [(i.source, i.index, i.field) for i in issues] == [("a.json", 0, field)]
+
+
+def test_reports_every_problem():
+    config = {
+        "descriptions": [
+            _description(),
+            {"IntendedFor": 5},
+            _description(criteria={}),
+        ],
+    }
+
+    issues = validate_config(config)
+
+    assert [(i.index, i.field) for i in issues] == [
+        (1, "dataType"),
+        (1, "modalityLabel"),
+        (1, "criteria"),
+        (1, "IntendedFor"),
+        (2, "criteria"),
+    ]
+    assert str(issues[0]) == "<config>:1: dataType: is required"
+    assert len(validate_config(config, fail_fast=True)) == 1
+
+
+@pytest.mark.parametrize(
+    ("config", "field"),
+    [([], "config"), ({"descriptions": {}}, "descriptions")],
+)
+def test_invalid_config(config, field):
+    issues = validate_config(config)  # type: ignore
+
+    assert [(i.index, i.field) for i in issues] == [(None, field)]
+
+
+def test_null_descriptions_are_allowed():
+    # like combine_config, which treats these as "no descriptions"
+    assert validate_config({"descriptions": None}) == []
+    assert validate_config({}) == []
+
+
+def test_validate_configs_finds_duplicate_ids():
+    configs = [
+        {"descriptions": [_description(id="x")]},
+        {"descriptions": [_description(), _description(id="x")]},
+    ]
+
+    issues = validate_configs(configs)
+
+    assert [(i.source, i.index, i.field) for i in issues] == [("config[1]", 1, "id")]
+
+
+def test_validate_config_files(datadir: Path, tmp_path: Path):
+    bad = tmp_path / "bad.json"
+    bad.write_text('{"descriptions": [{"IntendedFor": "x"}]}')
+    in_files = [datadir / "config1.json", bad, datadir / "config3.yaml"]
+
+    issues = validate_config_files(in_files, jobs=2)
+
+    assert {i.source for i in issues} == {str(bad)}
+    assert len(issues) == 3
+    assert len(validate_config_files(in_files, fail_fast=True)) == 1
+
+
+@pytest.mark.parametrize(
+    ("name", "content"),
+    [("bad.json", '{"descriptions": ['), ("bad.yaml", "descriptions: [\n")],
+)
+def test_validate_config_files_reports_parse_errors(
+    datadir: Path,
+    tmp_path: Path,
+    name: str,
+    content: str,
+):
+    bad = tmp_path / name
+    bad.write_text(content)
+
+    issues = validate_config_files([datadir / "config1.json", bad])
+
+    assert [(i.source, i.index, i.field) for i in issues] == [(str(bad), None, "file")]
+    assert str(issues[0]).startswith(f"{bad}: file: could not be parsed")
+
+
+def test_validate_config_files_reports_load_errors(
+    datadir: Path,
+    tmp_path: Path,
+    yaml_not_found,
+):
+    missing = tmp_path / "missing.json"
+    pickled = tmp_path / "config.pickle"
+    pickled.write_bytes(b"")
+    in_files = [datadir / "config1.json", missing, pickled, datadir / "config3.yaml"]
+
+    issues = validate_config_files(in_files)
+
+    assert [(i.source, i.index, i.field) for i in issues] == [
+        (str(fp), None, "file") for fp in in_files[1:]
+    ]
+    assert all(i.message.startswith("could not be loaded: ") for i in issues)
+
+
+def test_validate_config_files_fail_fast_does_not_wait(
+    tmp_path: Path,
+    mocker: MockerFixture,
+):
+    loaded: List[str] = []
+
+    def load(fp: Path):
+        loaded.append(fp.name)
+        if fp.name == "bad.json":
+            return {"descriptions": [{}]}
+        time.sleep(0.5)
+        return {"descriptions": []}
+
+    mocker.patch("compile_dcm2bids_config.load_config_file", load)
+    in_files = [tmp_path / f"slow{i}.json" for i in range(10)]
+    in_files.insert(1, tmp_path / "bad.json")
+
+    start = time.perf_counter()
+    issues = validate_config_files(in_files, fail_fast=True, jobs=2)
+    elapsed = time.perf_counter() - start
+
+    assert [i.source for i in issues] == [str(tmp_path / "bad.json")]
+    assert elapsed < 0.4
+    time.sleep(0.6)  # let the in-flight load finish
+    assert len(loaded) < len(in_files)  # the rest were cancelled
+
+
+def test_combine_config_with_validate():
+    configs = [{"descriptions": [_description(), {"IntendedFor": [0, 2.5]}]}]
+
+    with pytest.raises(ConfigValidationError) as e:
+        combine_config(configs, validate=True)
+
+    assert len(e.value.issues) == 4
+    assert combine_config([{"descriptions": [_description()]}], validate=True)